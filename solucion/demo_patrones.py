@@ -19,33 +19,67 @@ Requisitos:
     - Base de datos con productos de ejemplo
 """
 
+import io
+import logging
 import os
 import sys
 import django
 from datetime import datetime
+from django.db import transaction
 
-# Configurar Django
-sys.path.append(os.path.join(os.path.dirname(__file__), 'mercado_barrio'))
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mercado_barrio.settings')
-django.setup()
-
-# Importar después de configurar Django
-from mercado_barrio.orders.services import (
-    handle_create_order,
-    OrderBuilder,
-    ShippingAdapterFactory,
-    ProviderSelector,
-    StandardSelectionStrategy,
-    EcoFriendlySelectionStrategy,
-    CostOptimizedSelectionStrategy,
-    OrderNotificationSubject,
-    EmailNotificationObserver,
-    WebhookNotificationObserver,
-    SMSNotificationObserver,
-    products_all
+# Servicios usados por las demostraciones (se importan en _bootstrap())
+_SERVICE_NAMES = (
+    'handle_create_order',
+    'OrderBuilder',
+    'ShippingAdapterFactory',
+    'ProviderSelector',
+    'StandardSelectionStrategy',
+    'EcoFriendlySelectionStrategy',
+    'CostOptimizedSelectionStrategy',
+    'OrderNotificationSubject',
+    'EmailNotificationObserver',
+    'WebhookNotificationObserver',
+    'SMSNotificationObserver',
+    'products_all',
 )
 
 
+def _bootstrap():
+    """
+    Configura Django e importa los servicios como globales del módulo.
+    Solo se ejecuta desde main(): importar este archivo no inicializa Django.
+    """
+    sys.path.append(os.path.join(os.path.dirname(__file__), 'mercado_barrio'))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mercado_barrio.settings')
+    django.setup()
+    
+    # Importar después de configurar Django
+    from mercado_barrio.orders import services
+    globals().update({name: getattr(services, name) for name in _SERVICE_NAMES})
+    
+    # Los observadores registran sus envíos con logging en nivel DEBUG;
+    # la demo los muestra en consola igual que el resto de la salida
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    services.logger.addHandler(handler)
+    services.logger.setLevel(logging.DEBUG)
+
+
+# Estrategias sin estado: se instancian una sola vez y se reutilizan entre ejecuciones
+_STRATEGIES = {}
+
+
+def get_strategies():
+    """Retorna las estrategias de la demo, creándolas solo en la primera llamada."""
+    if not _STRATEGIES:
+        _STRATEGIES.update({
+            'Estándar': StandardSelectionStrategy(),
+            'Ecológica': EcoFriendlySelectionStrategy(),
+            'Optimizada por Costo': CostOptimizedSelectionStrategy(),
+        })
+    return _STRATEGIES
+
+
 def print_header(title: str):
     """Imprime un encabezado formateado."""
     print("\n" + "=" * 80)
@@ -53,18 +87,26 @@ def print_header(title: str):
     print("=" * 80)
 
 
-def print_section(title: str):
+def print_section(title: str, file=None):
     """Imprime un encabezado de sección."""
-    print(f"\n🔹 {title}")
-    print("-" * 60)
+    print(f"\n🔹 {title}", file=file)
+    print("-" * 60, file=file)
+
+
+def flush_buffer(buf: io.StringIO):
+    """Vuelca la salida acumulada de una sección a stdout en una sola escritura."""
+    sys.stdout.write(buf.getvalue())
+    buf.seek(0)
+    buf.truncate()
 
 
 def demo_builder_pattern():
     """Demuestra el patrón Builder para construcción de pedidos."""
-    print_section("PATRÓN CREACIONAL: BUILDER")
+    buf = io.StringIO()
+    print_section("PATRÓN CREACIONAL: BUILDER", file=buf)
     
-    print("El patrón Builder permite construir objetos complejos paso a paso.")
-    print("En nuestro caso, construye pedidos con validaciones y cálculos complejos.\n")
+    print("El patrón Builder permite construir objetos complejos paso a paso.", file=buf)
+    print("En nuestro caso, construye pedidos con validaciones y cálculos complejos.\n", file=buf)
     
     # Demostrar construcción con Builder
     builder = OrderBuilder()
@@ -82,30 +124,33 @@ def demo_builder_pattern():
                         .with_items(sample_items)
                         .get_order_summary())
         
-        print("✅ Builder configurado exitosamente:")
-        print(f"   📧 Cliente: {order_summary['customer_email']}")
-        print(f"   📍 Dirección: {order_summary['address']}")
-        print(f"   ⚡ Prioridad: {order_summary['priority']}")
-        print(f"   📦 Código paquete: {order_summary['package_code']}")
-        print(f"   🏷️  Etiqueta: {order_summary['handling_label']}")
-        print(f"   ⚖️  Peso total: {order_summary['total_weight']}g")
+        print("✅ Builder configurado exitosamente:", file=buf)
+        print(f"   📧 Cliente: {order_summary['customer_email']}", file=buf)
+        print(f"   📍 Dirección: {order_summary['address']}", file=buf)
+        print(f"   ⚡ Prioridad: {order_summary['priority']}", file=buf)
+        print(f"   📦 Código paquete: {order_summary['package_code']}", file=buf)
+        print(f"   🏷️  Etiqueta: {order_summary['handling_label']}", file=buf)
+        print(f"   ⚖️  Peso total: {order_summary['total_weight']}g", file=buf)
         
-        print(f"\n💡 VENTAJAS del patrón Builder:")
-        print(f"   - Construcción paso a paso con validaciones")
-        print(f"   - Method chaining para código fluido")
-        print(f"   - Separación de construcción y representación")
-        print(f"   - Reutilizable para diferentes tipos de pedidos")
+        print(f"\n💡 VENTAJAS del patrón Builder:", file=buf)
+        print(f"   - Construcción paso a paso con validaciones", file=buf)
+        print(f"   - Method chaining para código fluido", file=buf)
+        print(f"   - Separación de construcción y representación", file=buf)
+        print(f"   - Reutilizable para diferentes tipos de pedidos", file=buf)
         
     except Exception as e:
-        print(f"❌ Error en Builder: {e}")
+        print(f"❌ Error en Builder: {e}", file=buf)
+    
+    flush_buffer(buf)
 
 
 def demo_adapter_pattern():
     """Demuestra el patrón Adapter para unificar APIs de proveedores."""
-    print_section("PATRÓN ESTRUCTURAL: ADAPTER")
+    buf = io.StringIO()
+    print_section("PATRÓN ESTRUCTURAL: ADAPTER", file=buf)
     
-    print("El patrón Adapter permite que interfaces incompatibles trabajen juntas.")
-    print("Unifica las diferentes APIs de proveedores bajo una interfaz común.\n")
+    print("El patrón Adapter permite que interfaces incompatibles trabajen juntas.", file=buf)
+    print("Unifica las diferentes APIs de proveedores bajo una interfaz común.\n", file=buf)
     
     # Demostrar adapters para diferentes proveedores
     providers = ['motoya', 'ecobike', 'paqz']
@@ -117,8 +162,8 @@ def demo_adapter_pattern():
         'address': 'Calle Principal 456'
     }
     
-    print("🔌 Probando adapters con datos unificados:")
-    print(f"   📦 Datos del pedido: {order_data}\n")
+    print("🔌 Probando adapters con datos unificados:", file=buf)
+    print(f"   📦 Datos del pedido: {order_data}\n", file=buf)
     
     for provider_name in providers:
         try:
@@ -128,26 +173,28 @@ def demo_adapter_pattern():
             # Usar interfaz unificada
             tracking_id = adapter.request_pickup(order_data)
             
-            print(f"✅ {adapter.get_provider_name().upper()}")
-            print(f"   🏷️  Tracking generado: {tracking_id}")
-            print(f"   🔧 API específica adaptada correctamente")
+            print(f"✅ {adapter.get_provider_name().upper()}", file=buf)
+            print(f"   🏷️  Tracking generado: {tracking_id}", file=buf)
+            print(f"   🔧 API específica adaptada correctamente", file=buf)
             
         except Exception as e:
-            print(f"❌ Error con {provider_name}: {e}")
-    
-    print(f"\n💡 VENTAJAS del patrón Adapter:")
-    print(f"   - Interfaz unificada para APIs heterogéneas")
-    print(f"   - Fácil agregar nuevos proveedores")
-    print(f"   - Desacopla cliente de implementaciones específicas")
-    print(f"   - Factory pattern para gestión centralizada")
+            print(f"❌ Error con {provider_name}: {e}", file=buf)
+    
+    print(f"\n💡 VENTAJAS del patrón Adapter:", file=buf)
+    print(f"   - Interfaz unificada para APIs heterogéneas", file=buf)
+    print(f"   - Fácil agregar nuevos proveedores", file=buf)
+    print(f"   - Desacopla cliente de implementaciones específicas", file=buf)
+    print(f"   - Factory pattern para gestión centralizada", file=buf)
+    flush_buffer(buf)
 
 
 def demo_strategy_pattern():
     """Demuestra el patrón Strategy para selección de proveedores."""
-    print_section("PATRÓN COMPORTAMENTAL: STRATEGY")
+    buf = io.StringIO()
+    print_section("PATRÓN COMPORTAMENTAL: STRATEGY", file=buf)
     
-    print("El patrón Strategy define una familia de algoritmos intercambiables.")
-    print("Permite cambiar el algoritmo de selección de proveedores dinámicamente.\n")
+    print("El patrón Strategy define una familia de algoritmos intercambiables.", file=buf)
+    print("Permite cambiar el algoritmo de selección de proveedores dinámicamente.\n", file=buf)
     
     # Datos de prueba para diferentes escenarios
     test_scenarios = [
@@ -165,41 +212,38 @@ def demo_strategy_pattern():
         }
     ]
     
-    # Estrategias disponibles
-    strategies = {
-        'Estándar': StandardSelectionStrategy(),
-        'Ecológica': EcoFriendlySelectionStrategy(),
-        'Optimizada por Costo': CostOptimizedSelectionStrategy()
-    }
+    # Estrategias disponibles y un único selector para todos los escenarios
+    strategies = get_strategies()
+    selector = ProviderSelector()
     
     for scenario in test_scenarios:
-        print(f"📊 Escenario: {scenario['name']}")
-        print(f"   Datos: {scenario['data']}")
-        
-        selector = ProviderSelector()
+        print(f"📊 Escenario: {scenario['name']}", file=buf)
+        print(f"   Datos: {scenario['data']}", file=buf)
         
         for strategy_name, strategy in strategies.items():
             # Cambiar estrategia dinámicamente
             selector.set_strategy(strategy)
             result = selector.select_provider(scenario['data'])
             
-            print(f"   🎯 {strategy_name}: {result['provider']} - {result['reason']}")
+            print(f"   🎯 {strategy_name}: {result['provider']} - {result['reason']}", file=buf)
         
-        print()
-    
-    print(f"💡 VENTAJAS del patrón Strategy:")
-    print(f"   - Algoritmos intercambiables en tiempo de ejecución")
-    print(f"   - Elimina condicionales complejas (if/else)")
-    print(f"   - Fácil agregar nuevas estrategias")
-    print(f"   - Principio Abierto/Cerrado (OCP)")
+        print(file=buf)
+    
+    print(f"💡 VENTAJAS del patrón Strategy:", file=buf)
+    print(f"   - Algoritmos intercambiables en tiempo de ejecución", file=buf)
+    print(f"   - Elimina condicionales complejas (if/else)", file=buf)
+    print(f"   - Fácil agregar nuevas estrategias", file=buf)
+    print(f"   - Principio Abierto/Cerrado (OCP)", file=buf)
+    flush_buffer(buf)
 
 
 def demo_observer_pattern():
     """Demuestra el patrón Observer para notificaciones."""
-    print_section("PATRÓN COMPORTAMENTAL: OBSERVER")
+    buf = io.StringIO()
+    print_section("PATRÓN COMPORTAMENTAL: OBSERVER", file=buf)
     
-    print("El patrón Observer define dependencia uno-a-muchos entre objetos.")
-    print("Permite notificar automáticamente a múltiples canales cuando cambia el estado.\n")
+    print("El patrón Observer define dependencia uno-a-muchos entre objetos.", file=buf)
+    print("Permite notificar automáticamente a múltiples canales cuando cambia el estado.\n", file=buf)
     
     # Crear sujeto observable
     notification_subject = OrderNotificationSubject()
@@ -209,53 +253,29 @@ def demo_observer_pattern():
     webhook_observer = WebhookNotificationObserver("https://api.sistema-externo.com/hooks")
     sms_observer = SMSNotificationObserver("+57-300-123-4567")
     
-    print("🔔 Configurando observadores:")
+    print("🔔 Configurando observadores:", file=buf)
+    flush_buffer(buf)  # El sujeto escribe directamente en stdout
     
     # Agregar observadores dinámicamente
     notification_subject.attach_observer(email_observer)
     notification_subject.attach_observer(webhook_observer)
     notification_subject.attach_observer(sms_observer)
     
-    print(f"   📝 Observadores activos: {notification_subject.get_observers_info()}")
+    print(f"   📝 Observadores activos: {notification_subject.get_observers_info()}", file=buf)
     
-    # Crear pedido temporal para demostración (sin persistir para evitar conflictos FK)
+    # Pedido en memoria (sin guardar): la demostración no escribe en la base de datos
     from mercado_barrio.orders.models import Order
     
-    # Intentar usar pedido existente, o crear uno temporal sin guardar
-    try:
-        # Usar el último pedido de la base de datos si existe
-        mock_order = Order.objects.last()
-        if not mock_order:
-            # Si no hay pedidos, crear uno temporal sin guardar
-            mock_order = Order(
-                id=9999,  # ID alto para evitar conflictos
-                customer_email="demo@mercadobarrio.com",
-                address="Dirección Demo 123",
-                priority="express",
-                fragility="alta",
-                total_weight=1200
-            )
-            # Guardar temporalmente para que funcionen las notificaciones
-            mock_order.save()
-            temp_order_created = True
-        else:
-            temp_order_created = False
-            print(f"   📦 Usando pedido existente #{mock_order.id} para demostración")
-    except Exception as e:
-        print(f"   ⚠️  Error accediendo a pedidos existentes: {e}")
-        # Crear pedido temporal
-        mock_order = Order(
-            id=9999,
-            customer_email="demo@mercadobarrio.com", 
-            address="Dirección Demo 123",
-            priority="express",
-            fragility="alta",
-            total_weight=1200
-        )
-        mock_order.save()
-        temp_order_created = True
-    
-    print(f"\n📦 Simulando eventos de pedido #{mock_order.id}:")
+    mock_order = Order(
+        id=9999,
+        customer_email="demo@mercadobarrio.com",
+        address="Dirección Demo 123",
+        priority="express",
+        fragility="alta",
+        total_weight=1200
+    )
+    
+    print(f"\n📦 Simulando eventos de pedido #{mock_order.id}:", file=buf)
     
     # Simular diferentes eventos del ciclo de vida del pedido
     events = [
@@ -266,28 +286,22 @@ def demo_observer_pattern():
     ]
     
     for event_type, message in events:
-        print(f"\n   🔄 Evento: {event_type}")
-        notification_subject.notify_observers(mock_order, event_type, message)
+        print(f"\n   🔄 Evento: {event_type}", file=buf)
+        flush_buffer(buf)
+        notification_subject.notify_observers(mock_order, event_type, message, persist=False)
     
     # Mostrar historial
-    print(f"\n📊 Historial de notificaciones:")
-    history = notification_subject.get_notification_history()
-    for i, event in enumerate(history[-2:], 1):  # Mostrar últimos 2
-        print(f"   {i}. {event['event_type']} - {event['observers_count']} canales notificados")
-    
-    # Limpiar pedido temporal si fue creado
-    if temp_order_created:
-        try:
-            mock_order.delete()
-            print(f"   🧹 Pedido temporal #{mock_order.id} eliminado")
-        except:
-            pass
-    
-    print(f"\n💡 VENTAJAS del patrón Observer:")
-    print(f"   - Desacoplamiento entre sujeto y observadores")
-    print(f"   - Agregar/remover observadores dinámicamente")
-    print(f"   - Notificación automática a múltiples canales")
-    print(f"   - Extensible para nuevos tipos de notificaciones")
+    print(f"\n📊 Historial de notificaciones:", file=buf)
+    history = notification_subject.get_notification_history(limit=2)
+    for i, event in enumerate(history, 1):  # Mostrar últimos 2
+        print(f"   {i}. {event['event_type']} - {event['observers_count']} canales notificados", file=buf)
+    
+    print(f"\n💡 VENTAJAS del patrón Observer:", file=buf)
+    print(f"   - Desacoplamiento entre sujeto y observadores", file=buf)
+    print(f"   - Agregar/remover observadores dinámicamente", file=buf)
+    print(f"   - Notificación automática a múltiples canales", file=buf)
+    print(f"   - Extensible para nuevos tipos de notificaciones", file=buf)
+    flush_buffer(buf)
 
 
 def demo_integrated_workflow():
@@ -307,6 +321,9 @@ def demo_integrated_workflow():
     for product in products[:3]:  # Mostrar primeros 3
         print(f"   {product.id}. {product.name} ({product.weight_grams}g)")
     
+    # Catálogo materializado una sola vez y reutilizado por las tres estrategias
+    catalog = {product.id: product for product in products}
+    
     # Datos de pedido de ejemplo
     order_data = {
         'customer_email': 'cliente.demo@mercadobarrio.com',
@@ -327,15 +344,17 @@ def demo_integrated_workflow():
         # Probar diferentes estrategias
         strategies = ['standard', 'eco', 'cost']
         
-        for strategy in strategies:
-            print(f"\n" + "="*50)
-            print(f"🎯 PROBANDO ESTRATEGIA: {strategy.upper()}")
-            print(f"="*50)
-            
-            # Crear pedido con la estrategia específica
-            order_id = handle_create_order(order_data, strategy_type=strategy)
-            
-            print(f"\n✅ Pedido #{order_id} creado exitosamente con estrategia {strategy}")
+        # Una sola transacción (un COMMIT) para los tres pedidos de prueba
+        with transaction.atomic():
+            for strategy in strategies:
+                print(f"\n" + "="*50)
+                print(f"🎯 PROBANDO ESTRATEGIA: {strategy.upper()}")
+                print(f"="*50)
+                
+                # Crear pedido con la estrategia específica
+                order_id = handle_create_order(order_data, strategy_type=strategy, catalog=catalog)
+                
+                print(f"\n✅ Pedido #{order_id} creado exitosamente con estrategia {strategy}")
             
     except Exception as e:
         print(f"❌ Error en flujo integrado: {e}")
@@ -355,6 +374,8 @@ def main():
     print("• COMPORTAMENTAL: Observer - Sistema de notificaciones multi-canal")
     
     try:
+        _bootstrap()
+        
         # Ejecutar demostraciones individuales
         demo_builder_pattern()
         demo_adapter_pattern()
@@ -7,7 +7,9 @@ Uso:
 python manage.py shell
 exec(open('load_initial_data.py').read())
 """
-from orders.models import Product
+from django.db import transaction
+from mercado_barrio.orders.models import Product
+from mercado_barrio.orders.services import invalidate_products_cache
 
 def load_products():
     """
@@ -22,9 +24,6 @@ def load_products():
     """
     print("Cargando productos iniciales (equivalente a seed.sql)...")
     
-    # Limpiar productos existentes si existen
-    Product.objects.all().delete()
-    
     # Crear productos - traducción directa de seed.sql
     products = [
         Product(sku='VEL-AROMA', name='Vela aromática', weight_grams=300, fragile=True),
@@ -34,14 +33,24 @@ def load_products():
         Product(sku='LIB-AG', name='Agenda pequeña', weight_grams=200, fragile=False),
     ]
     
-    # Equivalente a ON DUPLICATE KEY UPDATE en MySQL
-    Product.objects.bulk_create(products, ignore_conflicts=True)
+    # Equivalente a ON DUPLICATE KEY UPDATE en MySQL (INSERT ... ON CONFLICT DO UPDATE)
+    # Un solo statement: no borra productos referenciados por order_items
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=['name', 'weight_grams', 'fragile'],
+        )
+    
+    # bulk_create no emite post_save: invalidar el catálogo cacheado explícitamente
+    invalidate_products_cache()
     
     print(f"✅ {len(products)} productos cargados exitosamente")
     print("Los productos cargados son:")
-    for product in Product.objects.all():
-        fragile_text = "Frágil" if product.fragile else "No frágil"
-        print(f"  - {product.sku}: {product.name} ({product.weight_grams}g, {fragile_text})")
+    for sku, name, weight_grams, fragile in Product.objects.values_list('sku', 'name', 'weight_grams', 'fragile'):
+        fragile_text = "Frágil" if fragile else "No frágil"
+        print(f"  - {sku}: {name} ({weight_grams}g, {fragile_text})")
 
 if __name__ == "__main__":
     # Este script debe ejecutarse dentro del contexto de Django
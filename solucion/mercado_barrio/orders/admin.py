@@ -13,6 +13,7 @@ class ProductAdmin(admin.ModelAdmin):
     Equivalente a gestionar la tabla 'products' en phpMyAdmin.
     """
     list_display = ['sku', 'name', 'weight_grams', 'fragile']
+    show_full_result_count = False
     list_filter = ['fragile']
     search_fields = ['sku', 'name']
     ordering = ['name']
@@ -25,11 +26,18 @@ class OrderAdmin(admin.ModelAdmin):
     Equivalente a gestionar la tabla 'orders' en phpMyAdmin.
     """
     list_display = ['id', 'customer_email', 'priority', 'fragility', 'total_weight', 'created_at']
+    show_full_result_count = False
     list_filter = ['priority', 'fragility', 'created_at']
-    search_fields = ['customer_email', 'address']
+    search_fields = ['customer_email']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
 
+    def get_queryset(self, request):
+        # Solo las columnas que muestra el listado
+        return super().get_queryset(request).only(
+            'id', 'customer_email', 'priority', 'fragility', 'total_weight', 'created_at'
+        )
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -38,7 +46,9 @@ class OrderItemAdmin(admin.ModelAdmin):
     Equivalente a gestionar la tabla 'order_items' en phpMyAdmin.
     """
     list_display = ['order', 'product', 'quantity']
+    show_full_result_count = False
     list_filter = ['product']
+    list_select_related = ('order', 'product')
     autocomplete_fields = ['order', 'product']
 
 
@@ -49,6 +59,8 @@ class ShipmentAdmin(admin.ModelAdmin):
     Equivalente a gestionar la tabla 'shipments' en phpMyAdmin.
     """
     list_display = ['order', 'provider', 'tracking_id', 'status', 'created_at']
+    show_full_result_count = False
+    list_select_related = ('order',)
     list_filter = ['provider', 'status', 'created_at']
     search_fields = ['tracking_id', 'order__customer_email']
     ordering = ['-created_at']
@@ -62,6 +74,8 @@ class NotificationAdmin(admin.ModelAdmin):
     Equivalente a gestionar la tabla 'notifications' en phpMyAdmin.
     """
     list_display = ['order', 'channel', 'message', 'created_at']
+    show_full_result_count = False
+    list_select_related = ('order',)
     list_filter = ['channel', 'created_at']
     search_fields = ['message', 'order__customer_email']
     ordering = ['-created_at']
@@ -12,4 +12,8 @@ class OrdersConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mercado_barrio.orders'
-    verbose_name = 'Sistema de Pedidos MercadoBarrio'
\ No newline at end of file
+    verbose_name = 'Sistema de Pedidos MercadoBarrio'
+
+    def ready(self):
+        # Registrar los receptores de señales (invalidación de caché del catálogo)
+        from . import signals
@@ -1,14 +1,93 @@
 """
 Comando Django para poblar la base de datos con datos de ejemplo.
 Uso: python manage.py poblar_datos
+
+Todas las filas se insertan con bulk_create, que intencionalmente no emite
+pre_save/post_save ni llama a save() por fila, así que los receptores de
+orders/signals.py no se ejecutan: la invalidación de caché que hacen se
+realiza explícitamente al terminar la carga.
 """
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Count, Q
 from mercado_barrio.orders.models import Product, Order, OrderItem, Shipment, Notification
+from mercado_barrio.orders.services import invalidate_orders_cache, invalidate_products_cache
 from django.utils import timezone
 from datetime import timedelta
 import random
+import secrets
+
+
+# Filas leídas por lote del cursor y filas escritas por cada bulk_create
+CHUNK_SIZE = 500
+
+
+# Catálogo de ejemplo: (sku, nombre, peso_gramos, frágil)
+_PRODUCTOS = (
+    # Productos ligeros y no frágiles
+    ('SKU001', 'Arroz Diana 500g', 500, False),
+    ('SKU002', 'Aceite Gourmet 250ml', 300, False),
+    ('SKU003', 'Sal refinada 500g', 500, False),
+    ('SKU004', 'Azúcar blanca 1kg', 1000, False),
+    ('SKU005', 'Pasta Doria 500g', 500, False),
+    
+    # Productos medianos
+    ('SKU006', 'Detergente Ariel 1kg', 1100, False),
+    ('SKU007', 'Jabón en polvo 2kg', 2000, False),
+    ('SKU008', 'Champú Sedal 400ml', 450, False),
+    ('SKU009', 'Atún Van Camps 3 latas', 750, False),
+    ('SKU010', 'Leche en polvo Klim 400g', 400, False),
+    
+    # Productos pesados
+    ('SKU011', 'Aceite motor 4 litros', 4000, False),
+    ('SKU012', 'Detergente líquido 5L', 5200, False),
+    ('SKU013', 'Bulto arroz 5kg', 5000, False),
+    ('SKU014', 'Caja cerveza 24 unidades', 6000, False),
+    ('SKU015', 'Aceite cocina 1 galón', 3800, False),
+    
+    # Productos frágiles ligeros
+    ('SKU016', 'Copas vino cristal (6 und)', 800, True),
+    ('SKU017', 'Platos porcelana (4 und)', 1200, True),
+    ('SKU018', 'Bombillos LED (10 und)', 300, True),
+    ('SKU019', 'Floreros vidrio decorativo', 900, True),
+    ('SKU020', 'Vasos cristal (12 und)', 600, True),
+    
+    # Productos frágiles pesados
+    ('SKU021', 'Vajilla completa 50 piezas', 4500, True),
+    ('SKU022', 'Espejo decorativo grande', 3200, True),
+    ('SKU023', 'Lámpara mesa cristal', 2800, True),
+    ('SKU024', 'Set copas champagne (24)', 3600, True),
+    ('SKU025', 'Adornos navideños vidrio', 2200, True),
+    
+    # Productos especiales
+    ('SKU026', 'Laptop Gaming', 1800, True),
+    ('SKU027', 'Microondas pequeño', 8000, False),
+    ('SKU028', 'Cafetera express', 3500, True),
+    ('SKU029', 'Ventilador mesa', 2500, False),
+    ('SKU030', 'Radio portátil bluetooth', 400, True),
+)
+
+# Pedidos de ejemplo: (email, dirección, prioridad, fragilidad, peso_total, horas_atrás)
+_PEDIDOS = (
+    # Pedidos normales ligeros
+    ('cliente1@mercadobarrio.com', 'Carrera 15 #93-47, Bogotá', 'normal', 'ninguna', 1300, 2),
+    ('cliente2@mercadobarrio.com', 'Calle 72 #10-34, Medellín', 'normal', 'ninguna', 800, 1),
+    ('cliente3@mercadobarrio.com', 'Avenida Santander #45-67, Cali', 'normal', 'debil', 1500, 1),
+    
+    # Pedidos express frágiles
+    ('cliente4@mercadobarrio.com', 'Transversal 8 #12-90, Barranquilla', 'express', 'alta', 2400, 1),
+    ('cliente5@mercadobarrio.com', 'Diagonal 25 #34-12, Cartagena', 'express', 'alta', 1800, 1),
+    
+    # Pedidos pesados
+    ('cliente6@mercadobarrio.com', 'Calle Real #67-89, Bucaramanga', 'normal', 'ninguna', 9200, 3),
+    ('cliente7@mercadobarrio.com', 'Avenida Principal #23-45, Pereira', 'normal', 'debil', 7800, 2),
+    
+    # Pedidos mixtos
+    ('cliente8@mercadobarrio.com', 'Carrera 50 #28-14, Manizales', 'express', 'debil', 3200, 1),
+    ('cliente9@mercadobarrio.com', 'Calle 80 #15-32, Ibagué', 'normal', 'alta', 4500, 1),
+    ('cliente10@mercadobarrio.com', 'Avenida Boyacá #45-78, Santa Marta', 'express', 'ninguna', 2800, 1),
+)
 
 
 class Command(BaseCommand):
@@ -25,26 +104,45 @@ class Command(BaseCommand):
         self.stdout.write("🗄️  POBLANDO BASE DE DATOS CON DATOS DE EJEMPLO")
         self.stdout.write("=" * 60)
 
-        if options['limpiar']:
-            self.limpiar_datos()
+        # Tras --limpiar los IDs pueden reutilizarse: hay que descartar también
+        # la caché de los pedidos borrados
+        ids_previos = list(Order.objects.values_list('id', flat=True)) if options['limpiar'] else []
 
+        # Limpieza y carga en una sola transacción: un único COMMIT al final
+        # y, si algo falla, la base conserva los datos anteriores
         with transaction.atomic():
+            if options['limpiar']:
+                self.limpiar_datos()
+
             self.crear_productos()
             self.crear_pedidos()
             self.crear_envios()
             self.crear_notificaciones()
 
+        # bulk_create (y TRUNCATE) no emiten señales: invalidar la caché explícitamente,
+        # solo las claves del catálogo, la página principal y los pedidos (no las sesiones).
+        # Con LocMemCache cada proceso tiene su propia caché: para que esto llegue al
+        # servidor en ejecución hace falta un backend compartido (Redis, Memcached)
+        invalidate_products_cache()
+        invalidate_orders_cache(set(ids_previos).union(Order.objects.values_list('id', flat=True)))
+
         self.mostrar_resumen()
 
     def limpiar_datos(self):
         """Limpia todos los datos existentes."""
         self.stdout.write("🧹 Limpiando datos existentes...")
         
-        Notification.objects.all().delete()
-        Shipment.objects.all().delete()
-        OrderItem.objects.all().delete()
-        Order.objects.all().delete()
-        Product.objects.all().delete()
+        # Hijas antes que padres (importa para el borrado vía ORM)
+        models = [Notification, Shipment, OrderItem, Order, Product]
+        
+        if connection.vendor == 'postgresql':
+            # Una sola sentencia, sin recorrer filas ni disparar cascadas del ORM
+            tables = ', '.join(connection.ops.quote_name(m._meta.db_table) for m in models)
+            with connection.cursor() as cursor:
+                cursor.execute(f'TRUNCATE TABLE {tables} RESTART IDENTITY CASCADE')
+        else:
+            for model in models:
+                model.objects.all().delete()
         
         self.stdout.write("   ✅ Datos limpiados")
 
@@ -52,88 +150,27 @@ class Command(BaseCommand):
         """Crea productos de ejemplo."""
         self.stdout.write("📦 Creando productos...")
         
-        productos = [
-            # Productos ligeros y no frágiles
-            ('SKU001', 'Arroz Diana 500g', 500, False),
-            ('SKU002', 'Aceite Gourmet 250ml', 300, False),
-            ('SKU003', 'Sal refinada 500g', 500, False),
-            ('SKU004', 'Azúcar blanca 1kg', 1000, False),
-            ('SKU005', 'Pasta Doria 500g', 500, False),
-            
-            # Productos medianos
-            ('SKU006', 'Detergente Ariel 1kg', 1100, False),
-            ('SKU007', 'Jabón en polvo 2kg', 2000, False),
-            ('SKU008', 'Champú Sedal 400ml', 450, False),
-            ('SKU009', 'Atún Van Camps 3 latas', 750, False),
-            ('SKU010', 'Leche en polvo Klim 400g', 400, False),
-            
-            # Productos pesados
-            ('SKU011', 'Aceite motor 4 litros', 4000, False),
-            ('SKU012', 'Detergente líquido 5L', 5200, False),
-            ('SKU013', 'Bulto arroz 5kg', 5000, False),
-            ('SKU014', 'Caja cerveza 24 unidades', 6000, False),
-            ('SKU015', 'Aceite cocina 1 galón', 3800, False),
-            
-            # Productos frágiles ligeros
-            ('SKU016', 'Copas vino cristal (6 und)', 800, True),
-            ('SKU017', 'Platos porcelana (4 und)', 1200, True),
-            ('SKU018', 'Bombillos LED (10 und)', 300, True),
-            ('SKU019', 'Floreros vidrio decorativo', 900, True),
-            ('SKU020', 'Vasos cristal (12 und)', 600, True),
-            
-            # Productos frágiles pesados
-            ('SKU021', 'Vajilla completa 50 piezas', 4500, True),
-            ('SKU022', 'Espejo decorativo grande', 3200, True),
-            ('SKU023', 'Lámpara mesa cristal', 2800, True),
-            ('SKU024', 'Set copas champagne (24)', 3600, True),
-            ('SKU025', 'Adornos navideños vidrio', 2200, True),
-            
-            # Productos especiales
-            ('SKU026', 'Laptop Gaming', 1800, True),
-            ('SKU027', 'Microondas pequeño', 8000, False),
-            ('SKU028', 'Cafetera express', 3500, True),
-            ('SKU029', 'Ventilador mesa', 2500, False),
-            ('SKU030', 'Radio portátil bluetooth', 400, True),
-        ]
-        
-        for sku, name, weight, fragile in productos:
-            Product.objects.create(
-                sku=sku,
-                name=name,
-                weight_grams=weight,
-                fragile=fragile
-            )
+        # Un solo INSERT multi-fila en lugar de un INSERT por producto; los SKU
+        # ya existentes (ejecución sin --limpiar) los descarta la propia BD
+        Product.objects.bulk_create(
+            (
+                Product(sku=sku, name=name, weight_grams=weight, fragile=fragile)
+                for sku, name, weight, fragile in _PRODUCTOS
+            ),
+            batch_size=500,
+            ignore_conflicts=True,
+        )
         
-        self.stdout.write(f"   ✅ {len(productos)} productos creados")
+        self.stdout.write(f"   ✅ {len(_PRODUCTOS)} productos procesados")
 
     def crear_pedidos(self):
         """Crea pedidos de ejemplo."""
         self.stdout.write("🛒 Creando pedidos...")
         
-        pedidos_data = [
-            # Pedidos normales ligeros
-            ('cliente1@mercadobarrio.com', 'Carrera 15 #93-47, Bogotá', 'normal', 'ninguna', 1300, 2),
-            ('cliente2@mercadobarrio.com', 'Calle 72 #10-34, Medellín', 'normal', 'ninguna', 800, 1),
-            ('cliente3@mercadobarrio.com', 'Avenida Santander #45-67, Cali', 'normal', 'debil', 1500, 1),
-            
-            # Pedidos express frágiles
-            ('cliente4@mercadobarrio.com', 'Transversal 8 #12-90, Barranquilla', 'express', 'alta', 2400, 1),
-            ('cliente5@mercadobarrio.com', 'Diagonal 25 #34-12, Cartagena', 'express', 'alta', 1800, 1),
-            
-            # Pedidos pesados
-            ('cliente6@mercadobarrio.com', 'Calle Real #67-89, Bucaramanga', 'normal', 'ninguna', 9200, 3),
-            ('cliente7@mercadobarrio.com', 'Avenida Principal #23-45, Pereira', 'normal', 'debil', 7800, 2),
-            
-            # Pedidos mixtos
-            ('cliente8@mercadobarrio.com', 'Carrera 50 #28-14, Manizales', 'express', 'debil', 3200, 1),
-            ('cliente9@mercadobarrio.com', 'Calle 80 #15-32, Ibagué', 'normal', 'alta', 4500, 1),
-            ('cliente10@mercadobarrio.com', 'Avenida Boyacá #45-78, Santa Marta', 'express', 'ninguna', 2800, 1),
-        ]
-        
         products = list(Product.objects.all())
         
-        for email, address, priority, fragility, weight, hours_ago in pedidos_data:
-            order = Order.objects.create(
+        orders = Order.objects.bulk_create([
+            Order(
                 customer_email=email,
                 address=address,
                 priority=priority,
@@ -141,40 +178,53 @@ class Command(BaseCommand):
                 total_weight=weight,
                 created_at=timezone.now() - timedelta(hours=hours_ago)
             )
-            
-            # Crear items aleatorios para cada pedido
-            self.crear_items_pedido(order, weight)
+            for email, address, priority, fragility, weight, hours_ago in _PEDIDOS
+        ])
+        
+        # Acumular los items de todos los pedidos (bulk_create ya asignó los PK)
+        items_buffer = []
+        for order in orders:
+            items_buffer.extend(self.crear_items_pedido(order, order.total_weight, products))
+        OrderItem.objects.bulk_create(items_buffer, batch_size=1000)
         
-        self.stdout.write(f"   ✅ {len(pedidos_data)} pedidos creados")
+        self.stdout.write(f"   ✅ {len(_PEDIDOS)} pedidos creados")
 
-    def crear_items_pedido(self, order, target_weight):
-        """Crea items para un pedido específico."""
-        products = list(Product.objects.all())
+    def crear_items_pedido(self, order, target_weight, products):
+        """Genera (sin guardar) los items para un pedido con el catálogo ya cargado."""
         current_weight = 0
-        items_created = 0
+        items = []
+        
+        # Sorteo de los (hasta) 5 items de una vez en lugar de dos llamadas por item
+        picks = random.choices(products, k=5)
+        quantities = random.choices((1, 2, 3), k=5)
         
-        while current_weight < target_weight * 0.8 and items_created < 5:  # Hasta 80% del peso objetivo
-            product = random.choice(products)
-            quantity = random.randint(1, 3)
+        for product, quantity in zip(picks, quantities):
+            if current_weight >= target_weight * 0.8:  # Hasta 80% del peso objetivo
+                break
             
-            OrderItem.objects.create(
-                order=order,
-                product=product,
+            items.append(OrderItem(
+                order_id=order.id,
+                product_id=product.id,
                 quantity=quantity
-            )
+            ))
             
             current_weight += product.weight_grams * quantity
-            items_created += 1
+        
+        return items
 
     def crear_envios(self):
         """Crea envíos para los pedidos."""
         self.stdout.write("🚚 Creando envíos...")
         
-        orders = Order.objects.all()
+        orders = Order.objects.only('id', 'priority', 'fragility', 'total_weight', 'created_at')
         providers = ['motoya', 'ecobike', 'paqz']
         statuses = ['CONFIRMADO', 'DESPACHADO', 'EN_RUTA', 'ENTREGADO']
+        tracking_prefixes = {'motoya': 'MYA', 'ecobike': 'EBK', 'paqz': 'PAQ'}
+        shipments = []
+        total = 0
         
-        for i, order in enumerate(orders):
+        # Lectura en streaming: solo un lote de pedidos y de envíos en memoria
+        for order in orders.iterator(chunk_size=CHUNK_SIZE):
             # Seleccionar proveedor basado en las características del pedido
             if order.priority == 'express' and order.fragility == 'alta':
                 provider = 'ecobike'
@@ -183,59 +233,83 @@ class Command(BaseCommand):
             else:
                 provider = 'paqz'
             
-            # Generar tracking ID
-            tracking_prefixes = {'motoya': 'MYA', 'ecobike': 'EBK', 'paqz': 'PAQ'}
-            tracking_id = f"{tracking_prefixes[provider]}-{random.randint(100000, 999999)}"
+            # Generar tracking ID (mismo formato que los adaptadores de services.py)
+            tracking_id = f"{tracking_prefixes[provider]}-{secrets.token_hex(3).upper()}"
             
             # Status aleatorio pero lógico
             status = random.choice(statuses)
             
-            Shipment.objects.create(
-                order=order,
+            shipments.append(Shipment(
+                order_id=order.id,
                 provider=provider,
                 tracking_id=tracking_id,
                 status=status,
                 created_at=order.created_at + timedelta(minutes=5)
-            )
+            ))
+            
+            if len(shipments) >= CHUNK_SIZE:
+                total += self._flush(Shipment, shipments)
+        
+        total += self._flush(Shipment, shipments)
         
-        self.stdout.write(f"   ✅ {orders.count()} envíos creados")
+        self.stdout.write(f"   ✅ {total} envíos creados")
 
     def crear_notificaciones(self):
         """Crea notificaciones de ejemplo."""
         self.stdout.write("🔔 Creando notificaciones...")
         
-        orders = Order.objects.all()
-        channels = ['email', 'webhook', 'sms']
+        # Plantilla por canal, resuelta una sola vez fuera del bucle
+        confirmacion = "Pedido #{id} confirmado y asignado a {provider} ({tracking_id})"
+        templates = [
+            ('email', confirmacion),
+            ('webhook', confirmacion),
+            ('sms', "Pedido #{id} confirmado"),
+        ]
         
-        notifications_count = 0
-        for order in orders:
-            shipment = Shipment.objects.filter(order=order).first()
+        # Un solo SELECT de envíos; al recorrerlos por id ascendente el más reciente
+        # de cada pedido sobrescribe a los anteriores (igual que el antiguo .first())
+        shipments_by_order = {
+            s['order_id']: s
+            for s in Shipment.objects.order_by('id').values('order_id', 'provider', 'tracking_id', 'status')
+        }
+        
+        notifications = []
+        total = 0
+        for order in Order.objects.only('id', 'created_at').iterator(chunk_size=CHUNK_SIZE):
+            shipment = shipments_by_order.get(order.id)
             if shipment:
                 # Notificación de confirmación
-                for channel in channels:
-                    message = f"Pedido #{order.id} confirmado y asignado a {shipment.provider} ({shipment.tracking_id})"
-                    if channel == 'sms':
-                        message = f"Pedido #{order.id} confirmado"
-                    
-                    Notification.objects.create(
-                        order=order,
+                for channel, template in templates:
+                    notifications.append(Notification(
+                        order_id=order.id,
                         channel=channel,
-                        message=message,
+                        message=template.format(id=order.id, **shipment),
                         created_at=order.created_at + timedelta(minutes=10)
-                    )
-                    notifications_count += 1
+                    ))
                 
                 # Notificaciones adicionales para algunos estados
-                if shipment.status in ['DESPACHADO', 'EN_RUTA', 'ENTREGADO']:
-                    Notification.objects.create(
-                        order=order,
+                if shipment['status'] in ['DESPACHADO', 'EN_RUTA', 'ENTREGADO']:
+                    notifications.append(Notification(
+                        order_id=order.id,
                         channel='email',
-                        message=f"Pedido #{order.id} actualizado: {shipment.status}",
+                        message=f"Pedido #{order.id} actualizado: {shipment['status']}",
                         created_at=order.created_at + timedelta(hours=1)
-                    )
-                    notifications_count += 1
+                    ))
+            
+            if len(notifications) >= CHUNK_SIZE:
+                total += self._flush(Notification, notifications)
+        
+        total += self._flush(Notification, notifications)
         
-        self.stdout.write(f"   ✅ {notifications_count} notificaciones creadas")
+        self.stdout.write(f"   ✅ {total} notificaciones creadas")
+
+    def _flush(self, model, buffer):
+        """Inserta el lote acumulado, vacía el buffer y retorna cuántas filas escribió."""
+        count = len(buffer)
+        if count:
+            model.objects.bulk_create(buffer, batch_size=CHUNK_SIZE)
+            buffer.clear()
+        return count
 
     def mostrar_resumen(self):
         """Muestra un resumen de los datos creados."""
@@ -243,10 +317,21 @@ class Command(BaseCommand):
         self.stdout.write("🎉 BASE DE DATOS POBLADA EXITOSAMENTE")
         self.stdout.write("=" * 60)
         
-        products_count = Product.objects.count()
-        orders_count = Order.objects.count()
+        # Conteos condicionales: una consulta por modelo en lugar de una por cifra
+        products = Product.objects.aggregate(
+            total=Count('id'), fragiles=Count('id', filter=Q(fragile=True))
+        )
+        orders = Order.objects.aggregate(
+            total=Count('id'), express=Count('id', filter=Q(priority='express'))
+        )
+        shipments_by_provider = dict(
+            Shipment.objects.order_by().values_list('provider').annotate(Count('id'))
+        )
+        
+        products_count = products['total']
+        orders_count = orders['total']
         items_count = OrderItem.objects.count()
-        shipments_count = Shipment.objects.count()
+        shipments_count = sum(shipments_by_provider.values())
         notifications_count = Notification.objects.count()
         
         self.stdout.write(f"📦 Productos: {products_count}")
@@ -263,16 +348,16 @@ class Command(BaseCommand):
         self.stdout.write("\n📊 EJEMPLOS DE DATOS CREADOS:")
         
         # Productos por tipo
-        fragiles = Product.objects.filter(fragile=True).count()
+        fragiles = products['fragiles']
         self.stdout.write(f"   🔸 Productos frágiles: {fragiles}")
         self.stdout.write(f"   🔸 Productos normales: {products_count - fragiles}")
         
         # Pedidos por prioridad
-        express = Order.objects.filter(priority='express').count()
+        express = orders['express']
         self.stdout.write(f"   🔸 Pedidos express: {express}")
         self.stdout.write(f"   🔸 Pedidos normales: {orders_count - express}")
         
         # Envíos por proveedor
         for provider in ['motoya', 'ecobike', 'paqz']:
-            count = Shipment.objects.filter(provider=provider).count()
+            count = shipments_by_provider.get(provider, 0)
             self.stdout.write(f"   🔸 Envíos {provider}: {count}")
\ No newline at end of file
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-15 21:58
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='customer_email',
+            field=models.EmailField(db_index=True, max_length=120, validators=[django.core.validators.EmailValidator()]),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_alter_order_customer_email_alter_product_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='priority',
+            field=models.CharField(choices=[('normal', 'Normal'), ('express', 'Express')], db_index=True, default='normal', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='fragile',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AlterField(
+            model_name='shipment',
+            name='provider',
+            field=models.CharField(db_index=True, max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['order', '-id'], name='shipments_order_latest_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_alter_order_priority_alter_product_fragile_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='order',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='product',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='shipment',
+            options={},
+        ),
+    ]
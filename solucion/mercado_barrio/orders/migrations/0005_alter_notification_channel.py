@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_alter_order_options_alter_product_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='channel',
+            field=models.CharField(choices=[('email', 'Email'), ('webhook', 'Webhook'), ('sms', 'SMS')], db_index=True, max_length=20),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-15 22:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_alter_notification_channel'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='shipment',
+            name='shipments_order_latest_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='orders_created_at_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['order', '-id'], include=('provider', 'tracking_id', 'status'), name='shipments_order_latest_idx'),
+        ),
+    ]
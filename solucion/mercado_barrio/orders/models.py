@@ -20,18 +20,17 @@ class Product(models.Model):
     # Equivalente a: sku VARCHAR(50) NOT NULL UNIQUE
     sku = models.CharField(max_length=50, unique=True, null=False)
     
-    # Equivalente a: name VARCHAR(100) NOT NULL
-    name = models.CharField(max_length=100, null=False)
+    # Equivalente a: name VARCHAR(100) NOT NULL (indexado: búsqueda del admin)
+    name = models.CharField(max_length=100, null=False, db_index=True)
     
     # Equivalente a: weight_grams INT NOT NULL DEFAULT 0
     weight_grams = models.IntegerField(default=0, null=False)
     
-    # Equivalente a: fragile TINYINT(1) NOT NULL DEFAULT 0
-    fragile = models.BooleanField(default=False, null=False)
+    # Equivalente a: fragile TINYINT(1) NOT NULL DEFAULT 0 (indexado: filtros por fragilidad)
+    fragile = models.BooleanField(default=False, null=False, db_index=True)
 
     class Meta:
         db_table = 'products'
-        ordering = ['name']  # Equivalente a ORDER BY name ASC en products_all()
 
     def __str__(self):
         return f"{self.name} ({self.weight_grams}g)"
@@ -55,14 +54,14 @@ class Order(models.Model):
         ('alta', 'Alta'),
     ]
     
-    # Equivalente a: customer_email VARCHAR(120) NOT NULL
-    customer_email = models.EmailField(max_length=120, null=False, validators=[EmailValidator()])
+    # Equivalente a: customer_email VARCHAR(120) NOT NULL (indexado: búsqueda del admin)
+    customer_email = models.EmailField(max_length=120, null=False, db_index=True, validators=[EmailValidator()])
     
     # Equivalente a: address VARCHAR(200) NOT NULL
     address = models.CharField(max_length=200, null=False)
     
-    # Equivalente a: priority ENUM('normal','express') NOT NULL DEFAULT 'normal'
-    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='normal', null=False)
+    # Equivalente a: priority ENUM('normal','express') NOT NULL DEFAULT 'normal' (indexado)
+    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='normal', null=False, db_index=True)
     
     # Equivalente a: fragility ENUM('ninguna','debil','alta') NOT NULL DEFAULT 'ninguna'
     fragility = models.CharField(max_length=10, choices=FRAGILITY_CHOICES, default='ninguna', null=False)
@@ -75,7 +74,10 @@ class Order(models.Model):
 
     class Meta:
         db_table = 'orders'
-        ordering = ['-id']  # Equivalente a ORDER BY id DESC en orders_latest()
+        indexes = [
+            # Listados más recientes primero (admin ordena por -created_at)
+            models.Index(fields=['-created_at'], name='orders_created_at_desc_idx'),
+        ]
 
     def __str__(self):
         return f"Pedido #{self.id} - {self.customer_email}"
@@ -118,8 +120,8 @@ class Shipment(models.Model):
     # Equivalente a: order_id INT NOT NULL con FOREIGN KEY
     order = models.ForeignKey(Order, on_delete=models.CASCADE, null=False)
     
-    # Equivalente a: provider VARCHAR(30) NOT NULL
-    provider = models.CharField(max_length=30, null=False)
+    # Equivalente a: provider VARCHAR(30) NOT NULL (indexado: conteos por proveedor)
+    provider = models.CharField(max_length=30, null=False, db_index=True)
     
     # Equivalente a: tracking_id VARCHAR(60) NOT NULL
     tracking_id = models.CharField(max_length=60, null=False)
@@ -132,7 +134,12 @@ class Shipment(models.Model):
 
     class Meta:
         db_table = 'shipments'
-        ordering = ['-id']  # Para obtener el más reciente en shipment_by_order()
+        indexes = [
+            # Último envío de un pedido: WHERE order_id = ? ORDER BY id DESC LIMIT 1.
+            # En PostgreSQL cubre las columnas que lee shipment_by_order (index-only scan)
+            models.Index(fields=['order', '-id'], name='shipments_order_latest_idx',
+                         include=['provider', 'tracking_id', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.provider} - {self.tracking_id} (Pedido #{self.order.id})"
@@ -143,11 +150,18 @@ class Notification(models.Model):
     Modelo de notificaciones.
     Traducción directa de la tabla 'notifications' en schema.sql.
     """
+    # Canales emitidos por los observadores (email, webhook, SMS)
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('webhook', 'Webhook'),
+        ('sms', 'SMS'),
+    ]
+    
     # Equivalente a: order_id INT NOT NULL con FOREIGN KEY
     order = models.ForeignKey(Order, on_delete=models.CASCADE, null=False)
     
-    # Equivalente a: channel VARCHAR(20) NOT NULL
-    channel = models.CharField(max_length=20, null=False)
+    # Equivalente a: channel VARCHAR(20) NOT NULL (indexado: filtros y conteos por canal)
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, null=False, db_index=True)
     
     # Equivalente a: message VARCHAR(255) NOT NULL
     message = models.CharField(max_length=255, null=False)
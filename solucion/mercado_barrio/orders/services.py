@@ -5,15 +5,61 @@ Refactorizado para implementar patrones de diseño:
 - ESTRUCTURAL: Adapter (para unificar APIs de proveedores)
 - COMPORTAMENTAL: Strategy + Observer (para selección de proveedores y notificaciones)
 """
+import logging
+import random
 import secrets
+import sys
 from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import Executor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any, Protocol
+from functools import lru_cache, partial
+from itertools import islice
+from typing import List, Dict, Deque, Optional, Any, Callable, Iterable, Iterator, Protocol, Tuple, Union
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from .models import Product, Order, OrderItem, Shipment, Notification
 
+logger = logging.getLogger(__name__)
+
+# Nombres de proveedor internados: se usan como claves del factory y como retorno
+# de las estrategias en cada despacho
+_MOTOYA = sys.intern('motoya')
+_ECOBIKE = sys.intern('ecobike')
+_PAQZ = sys.intern('paqz')
+
+# Serialización JSON (webhooks y API): orjson (extensión C) si está instalado,
+# si no la librería estándar
+try:
+    import orjson
+
+    def json_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+        """Serializa obj a JSON en bytes UTF-8 (sort_keys: claves ordenadas)."""
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+except ImportError:
+    import json
+
+    def json_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+        """Serializa obj a JSON en bytes UTF-8 (sort_keys: claves ordenadas)."""
+        return json.dumps(obj, sort_keys=sort_keys).encode()
+
+
+# Generador en espacio de usuario para códigos de seguimiento simulados: no son
+# secretos, así que no hace falta pagar una llamada al CSPRNG del sistema por envío
+_rng = random.Random()
+
+
+def _tracking_suffix() -> str:
+    """Retorna 6 dígitos hexadecimales en mayúscula (mismo formato que token_hex(3).upper())."""
+    return f'{_rng.getrandbits(24):06X}'
+
 
 # ==========================================
 # PATRÓN CREACIONAL: BUILDER
@@ -109,12 +155,13 @@ class OrderBuilder:
         self._fragility = fragility if fragility in valid_options else 'ninguna'
         return self
     
-    def with_items(self, items: Dict[str, int]) -> 'OrderBuilder':
+    def with_items(self, items: Dict[str, int], catalog: Optional[Dict[int, Product]] = None) -> 'OrderBuilder':
         """
         Añade items al pedido y resuelve productos con cálculo de peso.
         
         Args:
             items: Diccionario {product_id: quantity}
+            catalog: Productos ya cargados {id: Product} (opcional, evita consultar la BD)
             
         Returns:
             Self para method chaining
@@ -123,10 +170,10 @@ class OrderBuilder:
             ValueError: Si no hay items válidos
         """
         self._items = items
-        self._resolve_items()
+        self._resolve_items(catalog)
         return self
     
-    def _resolve_items(self):
+    def _resolve_items(self, catalog: Optional[Dict[int, Product]] = None):
         """
         Resuelve los items del pedido validando productos y calculando peso total.
         Lógica extraída de handle_create_order().
@@ -134,32 +181,52 @@ class OrderBuilder:
         self._total_weight = 0
         self._resolved_items = []
         
+        # Descartar cantidades no positivas antes de tocar la BD: un pedido sin
+        # items válidos falla sin consultar productos
+        lines = []
         for product_id, qty in self._items.items():
             qty = int(qty)
-            if qty <= 0:
-                continue
-                
-            try:
-                product = Product.objects.get(id=product_id)
-                self._total_weight += (product.weight_grams * qty)
-                self._resolved_items.append({
-                    'product_id': product.id,
-                    'quantity': qty
-                })
-            except Product.DoesNotExist:
+            if qty > 0:
+                lines.append((int(product_id), qty))
+        if not lines:
+            raise ValueError('El pedido no tiene items válidos')
+        
+        # Solo se necesita el peso: {id: weight_grams} desde el catálogo o con un
+        # único SELECT id, weight_grams ... WHERE id IN (...) sin instanciar modelos
+        ids = [product_id for product_id, _ in lines]
+        if catalog is not None:
+            weights = {pid: catalog[pid].weight_grams for pid in ids if pid in catalog}
+        else:
+            weights = dict(Product.objects.filter(id__in=ids).values_list('id', 'weight_grams'))
+        
+        for product_id, qty in lines:
+            weight = weights.get(product_id)
+            if weight is None:
                 continue
+            
+            self._total_weight += (weight * qty)
+            self._resolved_items.append({
+                'product_id': product_id,
+                'quantity': qty
+            })
         
         if not self._resolved_items:
             raise ValueError('El pedido no tiene items válidos')
     
-    def _generate_package_attributes(self):
+    def _generate_package_attributes(self, ts: Optional[datetime] = None):
         """
         Genera atributos adicionales del paquete según los requisitos:
         - codigoPaquete: código único generado
         - pesoEstimado: peso calculado 
         - etiquetaManejo: etiqueta según fragilidad
         - fechaRecogidaEstimada: fecha estimada de recogida
+        
+        Args:
+            ts: Instante de referencia (aware); por defecto timezone.now()
         """
+        if ts is None:
+            ts = timezone.now()
+        
         # Generar código único del paquete
         self._package_code = f"PKG-{secrets.token_hex(6).upper()}"
         
@@ -173,7 +240,7 @@ class OrderBuilder:
         
         # Calcular fecha de recogida estimada (24-48 horas según prioridad)
         hours_offset = 24 if self._priority == 'express' else 48
-        self._estimated_pickup_date = datetime.now() + timedelta(hours=hours_offset)
+        self._estimated_pickup_date = ts + timedelta(hours=hours_offset)
     
     def build(self) -> Order:
         """
@@ -193,8 +260,11 @@ class OrderBuilder:
         if not self._resolved_items:
             raise ValueError('Items del pedido requeridos')
         
+        # Un único instante para todo el build (fecha de recogida y created_at)
+        ts = timezone.now()
+        
         # Generar atributos del paquete
-        self._generate_package_attributes()
+        self._generate_package_attributes(ts)
         
         # Crear pedido en la base de datos
         with transaction.atomic():
@@ -203,16 +273,19 @@ class OrderBuilder:
                 address=self._address,
                 priority=self._priority,
                 fragility=self._fragility,
-                total_weight=self._total_weight
+                total_weight=self._total_weight,
+                created_at=ts
             )
             
-            # Crear items del pedido
-            for item in self._resolved_items:
-                OrderItem.objects.create(
+            # Crear items del pedido en un solo INSERT
+            OrderItem.objects.bulk_create([
+                OrderItem(
                     order_id=order.id,
                     product_id=item['product_id'],
                     quantity=item['quantity']
                 )
+                for item in self._resolved_items
+            ])
             
             # Resetear builder para siguiente uso
             current_order = order
@@ -286,7 +359,7 @@ class MotoYAProvider:
         Método específico de la API de MotoYA.
         Simula la creación de una solicitud de entrega.
         """
-        tracking_code = f'MYA-{secrets.token_hex(3).upper()}'
+        tracking_code = f'MYA-{_tracking_suffix()}'
         return {
             'delivery_id': tracking_code,
             'status': 'ACCEPTED',
@@ -300,12 +373,13 @@ class EcoBikeProvider:
     Representa un servicio externo con interfaz diferente a MotoYA.
     """
     
-    def schedule_pickup(self, package_info: Dict[str, Any]) -> str:
+    def schedule_pickup(self, *, weight_grams: int, fragile: bool, priority: str, destination: str) -> str:
         """
         Método específico de la API de EcoBike.
         Simula la programación de recogida ecológica.
+        Recibe los datos del paquete como argumentos nombrados.
         """
-        return f'EBK-{secrets.token_hex(3).upper()}'
+        return f'EBK-{_tracking_suffix()}'
 
 
 class PaqueteriaZProvider:
@@ -319,7 +393,7 @@ class PaqueteriaZProvider:
         Método específico de la API de PaqueteríaZ.
         Simula el envío de un paquete tradicional.
         """
-        tracking_number = f'PAQ-{secrets.token_hex(3).upper()}'
+        tracking_number = f'PAQ-{_tracking_suffix()}'
         return {
             'tracking_number': tracking_number,
             'service_type': 'STANDARD',
@@ -333,6 +407,8 @@ class MotoYAAdapter:
     Traduce las llamadas de la interfaz común a la API específica de MotoYA.
     """
     
+    __slots__ = ('_provider',)
+    
     def __init__(self):
         self._provider = MotoYAProvider()
     
@@ -353,7 +429,7 @@ class MotoYAAdapter:
         return response['delivery_id']
     
     def get_provider_name(self) -> str:
-        return 'motoya'
+        return _MOTOYA
 
 
 class EcoBikeAdapter:
@@ -362,6 +438,8 @@ class EcoBikeAdapter:
     Traduce las llamadas de la interfaz común a la API específica de EcoBike.
     """
     
+    __slots__ = ('_provider',)
+    
     def __init__(self):
         self._provider = EcoBikeProvider()
     
@@ -375,17 +453,15 @@ class EcoBikeAdapter:
         Returns:
             Código de tracking de EcoBike
         """
-        package_info = {
-            'weight_grams': order_data.get('weight', 0),
-            'fragile': order_data.get('fragility', 'ninguna') != 'ninguna',
-            'priority': order_data.get('priority', 'normal'),
-            'destination': order_data.get('address', '')
-        }
-        
-        return self._provider.schedule_pickup(package_info)
+        return self._provider.schedule_pickup(
+            weight_grams=order_data.get('weight', 0),
+            fragile=order_data.get('fragility', 'ninguna') != 'ninguna',
+            priority=order_data.get('priority', 'normal'),
+            destination=order_data.get('address', '')
+        )
     
     def get_provider_name(self) -> str:
-        return 'ecobike'
+        return _ECOBIKE
 
 
 class PaqueteriaZAdapter:
@@ -394,6 +470,8 @@ class PaqueteriaZAdapter:
     Traduce las llamadas de la interfaz común a la API específica de PaqueteríaZ.
     """
     
+    __slots__ = ('_provider',)
+    
     def __init__(self):
         self._provider = PaqueteriaZProvider()
     
@@ -415,7 +493,7 @@ class PaqueteriaZAdapter:
         return response['tracking_number']
     
     def get_provider_name(self) -> str:
-        return 'paqz'
+        return _PAQZ
 
 
 class ShippingAdapterFactory:
@@ -425,15 +503,19 @@ class ShippingAdapterFactory:
     """
     
     _adapters = {
-        'motoya': MotoYAAdapter,
-        'ecobike': EcoBikeAdapter,
-        'paqz': PaqueteriaZAdapter
+        _MOTOYA: MotoYAAdapter,
+        _ECOBIKE: EcoBikeAdapter,
+        _PAQZ: PaqueteriaZAdapter
     }
     
+    # Los adapters no guardan estado entre solicitudes: una instancia compartida por proveedor
+    _instances: Dict[str, ShippingProvider] = {}
+    
     @classmethod
     def create_adapter(cls, provider_name: str) -> ShippingProvider:
         """
-        Crea un adapter para el proveedor especificado.
+        Obtiene el adapter para el proveedor especificado.
+        La instancia se crea en la primera solicitud y se reutiliza después.
         
         Args:
             provider_name: Nombre del proveedor ('motoya', 'ecobike', 'paqz')
@@ -444,12 +526,17 @@ class ShippingAdapterFactory:
         Raises:
             ValueError: Si el proveedor no es válido
         """
-        adapter_class = cls._adapters.get(provider_name.lower())
+        key = provider_name.lower()
+        adapter = cls._instances.get(key)
+        if adapter is not None:
+            return adapter
+        
+        adapter_class = cls._adapters.get(key)
         if not adapter_class:
             available = ', '.join(cls._adapters.keys())
             raise ValueError(f'Proveedor no válido: {provider_name}. Disponibles: {available}')
         
-        return adapter_class()
+        return cls._instances.setdefault(key, adapter_class())
     
     @classmethod
     def get_available_providers(cls) -> List[str]:
@@ -466,12 +553,116 @@ class ShippingAdapterFactory:
 # PATRÓN COMPORTAMENTAL: STRATEGY
 # ==========================================
 
+@dataclass
+class OrderBatch:
+    """
+    Lote de pedidos en formato columnar (una secuencia por campo) para selección masiva.
+    Evita consultar un diccionario por pedido y campo cuando se procesan miles de pedidos.
+    """
+    weights: array            # array('q') con el peso en gramos de cada pedido
+    priorities: Tuple[str, ...]
+    fragilities: Tuple[str, ...]
+    
+    @classmethod
+    def from_orders(cls, orders: Iterable[Dict[str, Any]]) -> 'OrderBatch':
+        """
+        Construye el lote a partir de datos de pedido en formato diccionario.
+        
+        Args:
+            orders: Datos de los pedidos (mismo formato que select_provider)
+            
+        Returns:
+            Lote columnar con los mismos pedidos, en el mismo orden
+        """
+        orders = list(orders)
+        return cls(
+            weights=array('q', [o.get('weight', 0) for o in orders]),
+            priorities=tuple(o.get('priority', 'normal') for o in orders),
+            fragilities=tuple(o.get('fragility', 'ninguna') for o in orders),
+        )
+    
+    def __len__(self) -> int:
+        return len(self.weights)
+
+
+@lru_cache(maxsize=None)
+def _selects_by_rules(strategy_cls: type) -> bool:
+    """
+    Indica si select_provider() de la clase se resuelve solo con _RULES/_DEFAULT:
+    la clase que define el select_provider() vigente también declara reglas no vacías.
+    """
+    for klass in strategy_cls.__mro__:
+        if 'select_provider' in vars(klass):
+            return bool(vars(klass).get('_RULES'))
+    return False
+
+
+def _iter_order_data(orders: Union[OrderBatch, Iterable[Dict[str, Any]]]) -> Iterable[Dict[str, Any]]:
+    """Datos de pedido (formato de select_provider) a partir de un OrderBatch o iterable."""
+    if not isinstance(orders, OrderBatch):
+        return orders
+    return ({'weight': weight, 'priority': priority, 'fragility': fragility}
+            for weight, priority, fragility in zip(orders.weights, orders.priorities, orders.fragilities))
+
+
 class ProviderSelectionStrategy(ABC):
     """
     Estrategia abstracta para la selección de proveedores de envío.
     Define la interfaz común para diferentes algoritmos de selección.
+    
+    Las estrategias concretas expresan sus reglas como datos: una tupla _RULES de
+    pares (predicado(peso, prioridad, fragilidad), proveedor) evaluados en orden,
+    y un proveedor _DEFAULT cuando ninguna regla aplica.
     """
     
+    # Nombre descriptivo constante; cada estrategia concreta define el suyo
+    STRATEGY_NAME: str = ''
+    _RULES: Tuple[Tuple[Callable[[int, str, str], bool], str], ...] = ()
+    _DEFAULT: str = _PAQZ
+    
+    def _apply_rules(self, order_data: Dict[str, Any]) -> str:
+        """Retorna el proveedor de la primera regla que se cumple."""
+        weight = order_data.get('weight', 0)
+        priority = order_data.get('priority', 'normal')
+        fragility = order_data.get('fragility', 'ninguna')
+        for predicate, provider in self._RULES:
+            if predicate(weight, priority, fragility):
+                return provider
+        return self._DEFAULT
+    
+    def select_batch(self, orders: Union[OrderBatch, Iterable[Dict[str, Any]]]) -> List[str]:
+        """
+        Selecciona proveedor para muchos pedidos en una sola llamada.
+        Equivale a llamar select_provider() por pedido, pero resuelve las reglas
+        y el proveedor por defecto una sola vez y recorre el lote por columnas.
+        
+        Args:
+            orders: Un OrderBatch o datos de pedidos (mismo formato que select_provider)
+            
+        Returns:
+            Lista de proveedores en el mismo orden que los pedidos
+        """
+        # Una estrategia que implementa su propio select_provider() (sin _RULES, o
+        # sobrescribiéndolo en una subclase) se evalúa pedido a pedido
+        if not _selects_by_rules(type(self)):
+            return [self.select_provider(order_data) for order_data in _iter_order_data(orders)]
+        
+        batch = orders if isinstance(orders, OrderBatch) else OrderBatch.from_orders(orders)
+        rules = self._RULES
+        default = self._DEFAULT
+        selected = []
+        append = selected.append
+        
+        for weight, priority, fragility in zip(batch.weights, batch.priorities, batch.fragilities):
+            for predicate, provider in rules:
+                if predicate(weight, priority, fragility):
+                    append(provider)
+                    break
+            else:
+                append(default)
+        
+        return selected
+    
     @abstractmethod
     def select_provider(self, order_data: Dict[str, Any]) -> str:
         """
@@ -485,15 +676,16 @@ class ProviderSelectionStrategy(ABC):
         """
         pass
     
-    @abstractmethod
     def get_strategy_name(self) -> str:
         """
         Obtiene el nombre de la estrategia.
         
+        Las estrategias pueden definir STRATEGY_NAME o sobrescribir este método.
+        
         Returns:
-            Nombre descriptivo de la estrategia
+            Nombre descriptivo de la estrategia (por defecto, atributo de clase STRATEGY_NAME)
         """
-        pass
+        return self.STRATEGY_NAME
 
 
 class StandardSelectionStrategy(ProviderSelectionStrategy):
@@ -503,6 +695,17 @@ class StandardSelectionStrategy(ProviderSelectionStrategy):
     Prioriza velocidad y costo según las reglas de negocio básicas.
     """
     
+    STRATEGY_NAME = 'Selección Estándar (velocidad/costo)'
+    
+    _RULES = (
+        # Regla 1: Express y frágil prefiere EcoBike
+        (lambda w, p, f: p == 'express' and f != 'ninguna', _ECOBIKE),
+        # Regla 2: Peso ligero prefiere MotoYA (rápido en ciudad)
+        (lambda w, p, f: w <= 1200, _MOTOYA),
+    )
+    # Regla 3: Resto usa PaqueteríaZ (para pesos altos y distancias largas)
+    _DEFAULT = _PAQZ
+    
     def select_provider(self, order_data: Dict[str, Any]) -> str:
         """
         Selecciona proveedor usando la lógica estándar:
@@ -510,23 +713,7 @@ class StandardSelectionStrategy(ProviderSelectionStrategy):
         2. Peso ligero (≤1200g) → MotoYA  
         3. Resto → PaqueteríaZ
         """
-        priority = order_data.get('priority', 'normal')
-        fragility = order_data.get('fragility', 'ninguna')
-        total_weight = order_data.get('weight', 0)
-        
-        # Regla 1: Express y frágil prefiere EcoBike
-        if priority == 'express' and fragility != 'ninguna':
-            return 'ecobike'
-        
-        # Regla 2: Peso ligero prefiere MotoYA (rápido en ciudad)
-        if total_weight <= 1200:
-            return 'motoya'
-        
-        # Regla 3: Resto usa PaqueteríaZ (para pesos altos y distancias largas)
-        return 'paqz'
-    
-    def get_strategy_name(self) -> str:
-        return 'Selección Estándar (velocidad/costo)'
+        return self._apply_rules(order_data)
 
 
 class EcoFriendlySelectionStrategy(ProviderSelectionStrategy):
@@ -535,6 +722,17 @@ class EcoFriendlySelectionStrategy(ProviderSelectionStrategy):
     Prioriza proveedores con menor impacto ambiental.
     """
     
+    STRATEGY_NAME = 'Selección Ecológica (menor impacto ambiental)'
+    
+    _RULES = (
+        # EcoBike tiene límite de peso (ej: 2kg) pero es ecológico
+        (lambda w, p, f: w <= 2000, _ECOBIKE),
+        # MotoYA es menos ecológico pero más rápido que PaqueteríaZ
+        (lambda w, p, f: w <= 5000 and f != 'alta', _MOTOYA),
+    )
+    # PaqueteríaZ para casos pesados o muy frágiles
+    _DEFAULT = _PAQZ
+    
     def select_provider(self, order_data: Dict[str, Any]) -> str:
         """
         Selecciona proveedor priorizando impacto ambiental:
@@ -542,22 +740,7 @@ class EcoFriendlySelectionStrategy(ProviderSelectionStrategy):
         2. MotoYA para casos donde EcoBike no es viable
         3. PaqueteríaZ solo cuando no hay alternativa
         """
-        total_weight = order_data.get('weight', 0)
-        fragility = order_data.get('fragility', 'ninguna')
-        
-        # EcoBike tiene límite de peso (ej: 2kg) pero es ecológico
-        if total_weight <= 2000:
-            return 'ecobike'
-        
-        # MotoYA es menos ecológico pero más rápido que PaqueteríaZ
-        if total_weight <= 5000 and fragility != 'alta':
-            return 'motoya'
-        
-        # PaqueteríaZ para casos pesados o muy frágiles
-        return 'paqz'
-    
-    def get_strategy_name(self) -> str:
-        return 'Selección Ecológica (menor impacto ambiental)'
+        return self._apply_rules(order_data)
 
 
 class CostOptimizedSelectionStrategy(ProviderSelectionStrategy):
@@ -566,6 +749,17 @@ class CostOptimizedSelectionStrategy(ProviderSelectionStrategy):
     Prioriza el proveedor más económico según el tipo de pedido.
     """
     
+    STRATEGY_NAME = 'Selección Optimizada por Costo'
+    
+    _RULES = (
+        # PaqueteríaZ es más barato para pesos altos
+        (lambda w, p, f: w > 3000, _PAQZ),
+        # EcoBike solo si es express y frágil (justifica el costo premium)
+        (lambda w, p, f: p == 'express' and f == 'alta', _ECOBIKE),
+    )
+    # MotoYA para el resto (buen balance costo/velocidad)
+    _DEFAULT = _MOTOYA
+    
     def select_provider(self, order_data: Dict[str, Any]) -> str:
         """
         Selecciona proveedor optimizando costos:
@@ -573,23 +767,56 @@ class CostOptimizedSelectionStrategy(ProviderSelectionStrategy):
         2. MotoYA para entregas urbanas normales
         3. EcoBike solo para express frágiles (valor agregado)
         """
-        priority = order_data.get('priority', 'normal')
-        fragility = order_data.get('fragility', 'ninguna')
-        total_weight = order_data.get('weight', 0)
-        
-        # PaqueteríaZ es más barato para pesos altos
-        if total_weight > 3000:
-            return 'paqz'
-        
-        # EcoBike solo si es express y frágil (justifica el costo premium)
-        if priority == 'express' and fragility == 'alta':
-            return 'ecobike'
-        
-        # MotoYA para el resto (buen balance costo/velocidad)
-        return 'motoya'
+        return self._apply_rules(order_data)
+
+
+# Estrategias sin estado: una instancia por tipo, compartida por todos los pedidos
+_STRATEGIES: Dict[str, ProviderSelectionStrategy] = {
+    'standard': StandardSelectionStrategy(),
+    'eco': EcoFriendlySelectionStrategy(),
+    'cost': CostOptimizedSelectionStrategy(),
+}
+
+
+class SelectionResult(Mapping):
+    """
+    Resultado de ProviderSelector.select_provider().
+    Es un Mapping de solo lectura (result['provider'], result['strategy'], result['reason'],
+    dict(result), **result); el texto de 'reason' solo se construye si alguien lo lee.
+    """
     
-    def get_strategy_name(self) -> str:
-        return 'Selección Optimizada por Costo'
+    __slots__ = ('provider', 'strategy', '_weight', '_priority', '_fragility')
+    
+    _KEYS = ('provider', 'strategy', 'reason')
+    
+    def __init__(self, provider: str, strategy: str, order_data: Dict[str, Any]):
+        self.provider = provider
+        self.strategy = strategy
+        # Copia de los datos usados en la selección: si el llamador modifica
+        # order_data después, 'reason' sigue describiendo esta selección
+        self._weight = order_data.get('weight', 0)
+        self._priority = order_data.get('priority', 'normal')
+        self._fragility = order_data.get('fragility', 'ninguna')
+    
+    @property
+    def reason(self) -> str:
+        """Explicación textual de por qué se seleccionó el proveedor."""
+        return (f"Proveedor {self.provider} seleccionado para pedido de {self._weight}g, "
+                f"prioridad {self._priority}, fragilidad {self._fragility}")
+    
+    def __getitem__(self, key: str) -> str:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+    
+    def __len__(self) -> int:
+        return len(self._KEYS)
+    
+    def __repr__(self) -> str:
+        return f"SelectionResult(provider={self.provider!r}, strategy={self.strategy!r})"
 
 
 class ProviderSelector:
@@ -598,6 +825,8 @@ class ProviderSelector:
     Permite cambiar algoritmos de selección dinámicamente.
     """
     
+    __slots__ = ('_strategy',)
+    
     def __init__(self, strategy: ProviderSelectionStrategy = None):
         """
         Inicializa el selector con una estrategia.
@@ -616,7 +845,7 @@ class ProviderSelector:
         """
         self._strategy = strategy
     
-    def select_provider(self, order_data: Dict[str, Any]) -> Dict[str, str]:
+    def select_provider(self, order_data: Dict[str, Any]) -> SelectionResult:
         """
         Selecciona un proveedor usando la estrategia actual.
         
@@ -624,39 +853,54 @@ class ProviderSelector:
             order_data: Datos del pedido
             
         Returns:
-            Diccionario con el proveedor seleccionado y la estrategia usada
+            Resultado con el proveedor seleccionado, la estrategia usada y la razón
+            (accesible como diccionario)
         """
-        selected_provider = self._strategy.select_provider(order_data)
-        
-        return {
-            'provider': selected_provider,
-            'strategy': self._strategy.get_strategy_name(),
-            'reason': self._get_selection_reason(order_data, selected_provider)
-        }
+        strategy = self._strategy
+        return SelectionResult(strategy.select_provider(order_data), strategy.get_strategy_name(), order_data)
     
-    def _get_selection_reason(self, order_data: Dict[str, Any], provider: str) -> str:
+    def select_providers_batch(self, orders: Union[OrderBatch, Iterable[Dict[str, Any]]]) -> List[str]:
         """
-        Genera una explicación de por qué se seleccionó el proveedor.
+        Selecciona proveedores para un lote de pedidos con la estrategia actual.
+        Pensado para despachos masivos: no genera estrategia ni razón por pedido.
         
         Args:
-            order_data: Datos del pedido
-            provider: Proveedor seleccionado
+            orders: Un OrderBatch o datos de los pedidos
             
         Returns:
-            Explicación textual de la selección
+            Lista de proveedores en el mismo orden que los pedidos
         """
-        weight = order_data.get('weight', 0)
-        priority = order_data.get('priority', 'normal')
-        fragility = order_data.get('fragility', 'ninguna')
-        
-        return f"Proveedor {provider} seleccionado para pedido de {weight}g, prioridad {priority}, fragilidad {fragility}"
+        return self._strategy.select_batch(orders)
 
 
 # ==========================================
 # PATRÓN COMPORTAMENTAL: OBSERVER
 # ==========================================
 
-def truncate_message_for_db(message: str, max_length: int = 255) -> str:
+# Plantillas de mensaje por tipo de evento (se interpolan con order_id y message)
+_EMAIL_TEMPLATES = {
+    'CREATED': "¡Pedido #{order_id} confirmado! {message}",
+    'DISPATCHED': "📦 Pedido #{order_id} despachado. {message}",
+    'IN_TRANSIT': "🚚 Pedido #{order_id} en camino. {message}",
+    'DELIVERED': "✅ Pedido #{order_id} entregado. {message}",
+}
+_EMAIL_DEFAULT_TEMPLATE = "Pedido #{order_id}: {message}"
+
+_SMS_TEMPLATES = {
+    'CREATED': "Pedido #{order_id} confirmado",
+    'DISPATCHED': "Pedido #{order_id} despachado",
+    'IN_TRANSIT': "Pedido #{order_id} en camino",
+    'DELIVERED': "Pedido #{order_id} entregado",
+}
+_SMS_DEFAULT_TEMPLATE = "Pedido #{order_id} actualizado"
+
+
+# Longitud de Notification.message (VARCHAR(255)) y sufijo para mensajes recortados
+_MAX_DB_MSG = 255
+_TRUNC_SUFFIX = "..."
+
+
+def truncate_message_for_db(message: str, max_length: int = _MAX_DB_MSG) -> str:
     """
     Trunca un mensaje para que pueda ser almacenado en la base de datos.
     
@@ -671,8 +915,7 @@ def truncate_message_for_db(message: str, max_length: int = 255) -> str:
         return message
     
     # Truncar dejando espacio para "..."
-    truncated = message[:max_length - 3] + "..."
-    return truncated
+    return message[:max_length - len(_TRUNC_SUFFIX)] + _TRUNC_SUFFIX
 
 class OrderObserver(ABC):
     """
@@ -680,8 +923,12 @@ class OrderObserver(ABC):
     Define el contrato para recibir notificaciones de eventos.
     """
     
+    # Sin __dict__: las subclases declaran sus propios __slots__
+    __slots__ = ()
+    
     @abstractmethod
-    def notify(self, order: Order, event_type: str, message: str) -> None:
+    def notify(self, order: Order, event_type: str, message: str, *,
+               timestamp: Optional[str] = None) -> Optional[Notification]:
         """
         Recibe notificación de un evento en el pedido.
         
@@ -689,6 +936,11 @@ class OrderObserver(ABC):
             order: Instancia del pedido
             event_type: Tipo de evento ('CREATED', 'DISPATCHED', 'IN_TRANSIT', 'DELIVERED')
             message: Mensaje descriptivo del evento
+            timestamp: Instante ISO-8601 del evento, calculado una vez por el sujeto
+            
+        Returns:
+            Notificación sin guardar para registrar en BD (el sujeto la persiste
+            junto con las de los demás observadores), o None si no hay nada que guardar
         """
         pass
     
@@ -709,7 +961,10 @@ class EmailNotificationObserver(OrderObserver):
     Simula el envío de emails al cliente cuando cambia el estado del pedido.
     """
     
-    def notify(self, order: Order, event_type: str, message: str) -> None:
+    __slots__ = ()
+    
+    def notify(self, order: Order, event_type: str, message: str, *,
+               timestamp: Optional[str] = None) -> Optional[Notification]:
         """
         Envía notificación por email (simulado).
         En implementación real aquí iría la lógica de envío de email.
@@ -717,31 +972,23 @@ class EmailNotificationObserver(OrderObserver):
         # Simular envío de email
         email_content = self._generate_email_content(order, event_type, message)
         
-        # Truncar mensaje para BD si es necesario
-        db_message = truncate_message_for_db(email_content)
+        # Log para demostración
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📧 EMAIL enviado a %s: %s", order.customer_email, email_content)
         
-        # Persistir notificación en base de datos
-        Notification.objects.create(
+        # Registro para BD (mensaje truncado si es necesario)
+        return Notification(
             order=order,
             channel='email',
-            message=db_message
+            message=truncate_message_for_db(email_content)
         )
-        
-        # Log para demostración
-        print(f"📧 EMAIL enviado a {order.customer_email}: {email_content}")
     
     def _generate_email_content(self, order: Order, event_type: str, message: str) -> str:
         """
         Genera el contenido del email según el tipo de evento.
         """
-        templates = {
-            'CREATED': f"¡Pedido #{order.id} confirmado! {message}",
-            'DISPATCHED': f"📦 Pedido #{order.id} despachado. {message}",
-            'IN_TRANSIT': f"🚚 Pedido #{order.id} en camino. {message}",
-            'DELIVERED': f"✅ Pedido #{order.id} entregado. {message}"
-        }
-        
-        return templates.get(event_type, f"Pedido #{order.id}: {message}")
+        template = _EMAIL_TEMPLATES.get(event_type, _EMAIL_DEFAULT_TEMPLATE)
+        return template.format(order_id=order.id, message=message)
     
     def get_observer_name(self) -> str:
         return 'Notificador Email'
@@ -753,6 +1000,8 @@ class WebhookNotificationObserver(OrderObserver):
     Simula llamadas HTTP a sistemas externos cuando cambia el estado del pedido.
     """
     
+    __slots__ = ('_webhook_url',)
+    
     def __init__(self, webhook_url: str = None):
         """
         Inicializa el observador webhook.
@@ -762,44 +1011,42 @@ class WebhookNotificationObserver(OrderObserver):
         """
         self._webhook_url = webhook_url or "https://api.external-system.com/webhook"
     
-    def notify(self, order: Order, event_type: str, message: str) -> None:
+    def notify(self, order: Order, event_type: str, message: str, *,
+               timestamp: Optional[str] = None) -> Optional[Notification]:
         """
         Envía notificación via webhook (simulado).
         En implementación real aquí iría la llamada HTTP real.
         """
-        webhook_payload = self._generate_webhook_payload(order, event_type, message)
+        webhook_payload = self._generate_webhook_payload(order, event_type, message, timestamp)
         
-        # Crear mensaje resumido para BD
-        db_message = f"Webhook a {self._webhook_url}: {event_type} para pedido #{order.id}"
-        db_message = truncate_message_for_db(db_message)
+        # Log para demostración (en real sería una llamada HTTP)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔗 WEBHOOK enviado a %s: %s", self._webhook_url, webhook_payload)
         
-        # Persistir notificación en base de datos
-        Notification.objects.create(
+        # Registro para BD con mensaje resumido
+        db_message = f"Webhook a {self._webhook_url}: {event_type} para pedido #{order.id}"
+        return Notification(
             order=order,
             channel='webhook',
-            message=db_message
+            message=truncate_message_for_db(db_message)
         )
-        
-        # Log para demostración (en real sería una llamada HTTP)
-        print(f"🔗 WEBHOOK enviado a {self._webhook_url}: {webhook_payload}")
     
-    def _generate_webhook_payload(self, order: Order, event_type: str, message: str) -> str:
+    def _generate_webhook_payload(self, order: Order, event_type: str, message: str,
+                                  timestamp: Optional[str] = None) -> str:
         """
         Genera el payload JSON para el webhook.
         """
-        import json
-        
         payload = {
             'order_id': order.id,
             'customer_email': order.customer_email,
             'event_type': event_type,
             'message': message,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp or timezone.now().isoformat(),
             'priority': order.priority,
             'total_weight': order.total_weight
         }
         
-        return json.dumps(payload)
+        return json_bytes(payload).decode()
     
     def get_observer_name(self) -> str:
         return f'Notificador Webhook ({self._webhook_url})'
@@ -811,57 +1058,66 @@ class SMSNotificationObserver(OrderObserver):
     Ejemplo de extensibilidad: fácil agregar nuevos canales.
     """
     
+    __slots__ = ('_phone_number',)
+    
     def __init__(self, phone_number: str = None):
         self._phone_number = phone_number or "+1234567890"
     
-    def notify(self, order: Order, event_type: str, message: str) -> None:
+    def notify(self, order: Order, event_type: str, message: str, *,
+               timestamp: Optional[str] = None) -> Optional[Notification]:
         """
         Envía notificación por SMS (simulado).
         """
         sms_content = self._generate_sms_content(order, event_type, message)
         
-        # Truncar mensaje para BD si es necesario (SMS ya es corto, pero por precaución)
-        db_message = truncate_message_for_db(sms_content)
+        # Log para demostración
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📱 SMS enviado a %s: %s", self._phone_number, sms_content)
         
-        # Persistir notificación en base de datos
-        Notification.objects.create(
+        # Registro para BD: las plantillas SMS son cortas por diseño, muy por debajo
+        # de _MAX_DB_MSG, así que no hace falta truncar
+        return Notification(
             order=order,
             channel='sms',
-            message=db_message
+            message=sms_content
         )
-        
-        # Log para demostración
-        print(f"📱 SMS enviado a {self._phone_number}: {sms_content}")
     
     def _generate_sms_content(self, order: Order, event_type: str, message: str) -> str:
         """
         Genera contenido corto para SMS.
         """
-        short_messages = {
-            'CREATED': f"Pedido #{order.id} confirmado",
-            'DISPATCHED': f"Pedido #{order.id} despachado",
-            'IN_TRANSIT': f"Pedido #{order.id} en camino",
-            'DELIVERED': f"Pedido #{order.id} entregado"
-        }
-        
-        return short_messages.get(event_type, f"Pedido #{order.id} actualizado")
+        template = _SMS_TEMPLATES.get(event_type, _SMS_DEFAULT_TEMPLATE)
+        return template.format(order_id=order.id)
     
     def get_observer_name(self) -> str:
         return f'Notificador SMS ({self._phone_number})'
 
 
+# Eventos que conserva el historial en memoria del sujeto (los más antiguos se descartan)
+_HISTORY_MAXLEN = 10_000
+
+
 class OrderNotificationSubject:
     """
     Sujeto observable que gestiona los observadores de pedidos.
     Mantiene la lista de observadores y los notifica cuando ocurren eventos.
     """
     
-    def __init__(self):
+    __slots__ = ('_observers', '_notification_history', '_executor')
+    
+    def __init__(self, executor: Optional[Executor] = None):
         """
         Inicializa el sujeto con lista vacía de observadores.
+        
+        Args:
+            executor: Ejecutor opcional (p.ej. ThreadPoolExecutor) para notificar a los
+                observadores en paralelo cuando hacen E/S real (HTTP, SMTP). Por defecto
+                se notifican en serie, en el orden en que fueron agregados.
         """
-        self._observers: List[OrderObserver] = []
-        self._notification_history: List[Dict[str, Any]] = []
+        # Indexados por id(): alta/baja en O(1) conservando el orden de inserción
+        self._observers: Dict[int, OrderObserver] = {}
+        self._notification_history: Deque[Dict[str, Any]] = deque(maxlen=_HISTORY_MAXLEN)
+        self._executor = executor
     
     def attach_observer(self, observer: OrderObserver) -> None:
         """
@@ -870,9 +1126,10 @@ class OrderNotificationSubject:
         Args:
             observer: Observador a agregar
         """
-        if observer not in self._observers:
-            self._observers.append(observer)
-            print(f"➕ Observador agregado: {observer.get_observer_name()}")
+        if id(observer) not in self._observers:
+            self._observers[id(observer)] = observer
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("➕ Observador agregado: %s", observer.get_observer_name())
     
     def detach_observer(self, observer: OrderObserver) -> None:
         """
@@ -881,11 +1138,11 @@ class OrderNotificationSubject:
         Args:
             observer: Observador a remover
         """
-        if observer in self._observers:
-            self._observers.remove(observer)
-            print(f"➖ Observador removido: {observer.get_observer_name()}")
+        if self._observers.pop(id(observer), None) is not None:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("➖ Observador removido: %s", observer.get_observer_name())
     
-    def notify_observers(self, order: Order, event_type: str, message: str) -> None:
+    def notify_observers(self, order: Order, event_type: str, message: str, persist: bool = True) -> None:
         """
         Notifica a todos los observadores sobre un evento.
         
@@ -893,26 +1150,58 @@ class OrderNotificationSubject:
             order: Pedido relacionado con el evento
             event_type: Tipo de evento
             message: Mensaje del evento
+            persist: Si es False no se guardan las notificaciones en BD (pedidos en memoria/demo)
         """
-        print(f"\n🔔 Notificando evento {event_type} para pedido #{order.id}")
-        print(f"   Observadores activos: {len(self._observers)}")
+        # Copia fija de los observadores: un attach/detach durante el envío no altera este evento
+        observers = tuple(self._observers.values())
+        
+        # Sin observadores no hay nada que notificar ni registrar
+        if not observers:
+            return
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("\n🔔 Notificando evento %s para pedido #%s\n   Observadores activos: %d",
+                         event_type, order.id, len(observers))
+        
+        # Un único instante para todo el evento (historial y observadores)
+        timestamp = timezone.now().isoformat()
         
         # Registrar en historial
         event_record = {
             'order_id': order.id,
             'event_type': event_type,
             'message': message,
-            'timestamp': datetime.now().isoformat(),
-            'observers_count': len(self._observers)
+            'timestamp': timestamp,
+            'observers_count': len(observers)
         }
         self._notification_history.append(event_record)
         
-        # Notificar a todos los observadores
-        for observer in self._observers:
+        # Notificar a todos los observadores y recoger sus registros pendientes
+        pending: List[Notification] = []
+        if self._executor is None:
+            calls = [(observer, partial(observer.notify, order, event_type, message, timestamp=timestamp))
+                     for observer in observers]
+        else:
+            # Envíos concurrentes: la latencia total es la del observador más lento
+            calls = [(observer, self._executor.submit(observer.notify, order, event_type, message,
+                                                     timestamp=timestamp).result)
+                     for observer in observers]
+        
+        for observer, result in calls:
             try:
-                observer.notify(order, event_type, message)
+                notification = result()
             except Exception as e:
-                print(f"❌ Error en observador {observer.get_observer_name()}: {e}")
+                logger.error("❌ Error en observador %s: %s", observer.get_observer_name(), e)
+                continue
+            if notification is not None:
+                pending.append(notification)
+        
+        # Un solo INSERT para todas las notificaciones del evento
+        if persist and pending:
+            with transaction.atomic():
+                Notification.objects.bulk_create(pending, batch_size=100)
+            # bulk_create no emite post_save: invalidar el detalle cacheado del pedido
+            invalidate_order_cache(order.id)
     
     def get_observers_info(self) -> List[str]:
         """
@@ -921,46 +1210,90 @@ class OrderNotificationSubject:
         Returns:
             Lista con nombres de observadores activos
         """
-        return [observer.get_observer_name() for observer in self._observers]
+        return [observer.get_observer_name() for observer in self._observers.values()]
     
-    def get_notification_history(self) -> List[Dict[str, Any]]:
+    def get_notification_history(self, limit: Optional[int] = None) -> Tuple[Dict[str, Any], ...]:
         """
         Obtiene el historial de notificaciones.
         
+        Args:
+            limit: Cantidad máxima de eventos a retornar (los más recientes).
+                Por defecto se retorna el historial completo.
+            
         Returns:
-            Lista con historial de eventos notificados
+            Tupla inmutable con los eventos notificados, del más antiguo al más reciente
         """
-        return self._notification_history.copy()
+        if limit is None:
+            return tuple(self._notification_history)
+        # Solo se recorren los últimos `limit` eventos, no todo el historial
+        recent = tuple(islice(reversed(self._notification_history), limit))
+        return recent[::-1]
 
 
 # ==========================================
 # FUNCIONES PÚBLICAS REFACTORIZADAS
 # ==========================================
 
+# Clave y vigencia (segundos) del catálogo cacheado por products_all()
+PRODUCTS_CACHE_KEY = 'products_all_v1'
+PRODUCTS_CACHE_TIMEOUT = 300
+
+
 def products_all() -> List[Product]:
     """
     Obtiene todos los productos ordenados por nombre.
-    Función utilitaria sin cambios (no requiere patrones).
+    El catálogo cambia poco: se sirve desde la caché de Django y se invalida
+    con invalidate_products_cache() (ver signals.py).
     """
-    return list(Product.objects.all().order_by('name'))
+    return cache.get_or_set(PRODUCTS_CACHE_KEY, lambda: list(Product.objects.all().order_by('name')),
+                            PRODUCTS_CACHE_TIMEOUT)
+
+
+def invalidate_products_cache() -> None:
+    """Descarta el catálogo cacheado; la próxima llamada a products_all() lo relee de BD."""
+    cache.delete(PRODUCTS_CACHE_KEY)
+    bump_home_cache_version()
+
+
+# Listado de la página principal (productos y pedidos recientes): el HTML se cachea
+# como fragmento de plantilla con una versión que cambia al modificarse los datos
+HOME_CACHE_VERSION_KEY = 'home_listing_version'
+HOME_CACHE_TIMEOUT = 60
+
+
+def home_cache_version() -> str:
+    """Versión vigente del fragmento cacheado de la página principal."""
+    return cache.get_or_set(HOME_CACHE_VERSION_KEY, lambda: secrets.token_hex(4), None)
+
+
+def bump_home_cache_version() -> None:
+    """Cambia la versión: los fragmentos cacheados anteriores dejan de usarse."""
+    cache.set(HOME_CACHE_VERSION_KEY, secrets.token_hex(4), None)
 
 
 def orders_latest(limit: int = 5) -> List[Order]:
     """
     Obtiene los últimos pedidos limitados por cantidad.
-    Función utilitaria sin cambios (no requiere patrones).
+    Solo carga las columnas del listado; con límites grandes lee el cursor por
+    bloques con iterator() (sin la caché de resultados del QuerySet).
     """
-    return list(Order.objects.all().order_by('-id')[:limit])
+    qs = (Order.objects.only('id', 'customer_email', 'priority', 'address', 'total_weight')
+          .order_by('-id')[:limit])
+    if limit > 500:
+        return list(qs.iterator(chunk_size=200))
+    return list(qs)
 
 
 def order_with_items(order_id: int) -> Optional[Dict[str, Any]]:
     """
     Obtiene un pedido con sus items asociados.
-    Función utilitaria sin cambios (no requiere patrones).
+    Los items traen su producto en el mismo JOIN, limitado a las columnas que se muestran.
     """
     try:
         order = Order.objects.get(id=order_id)
-        items = OrderItem.objects.filter(order_id=order_id).select_related('product')
+        items = (OrderItem.objects.filter(order_id=order_id)
+                 .select_related('product')
+                 .only('id', 'quantity', 'order_id', 'product__id', 'product__name', 'product__weight_grams'))
         
         return {
             'order': order,
@@ -973,15 +1306,118 @@ def order_with_items(order_id: int) -> Optional[Dict[str, Any]]:
 def shipment_by_order(order_id: int) -> Optional[Shipment]:
     """
     Obtiene el envío más reciente para un pedido.
-    Función utilitaria sin cambios (no requiere patrones).
+    Solo carga las columnas que muestra la vista; la consulta usa el índice (order_id, -id).
     """
-    try:
-        return Shipment.objects.filter(order_id=order_id).order_by('-id').first()
-    except Shipment.DoesNotExist:
-        return None
+    return (Shipment.objects.filter(order_id=order_id)
+            .only('id', 'order_id', 'provider', 'tracking_id', 'status')
+            .order_by('-id')
+            .first())
+
+
+# Vigencia (segundos) de los datos cacheados de la página de detalle de un pedido
+ORDER_DETAIL_CACHE_TIMEOUT = 60
+
 
+def order_detail_cache_key(order_id: int) -> str:
+    """Clave de caché de los datos de detalle de un pedido."""
+    return f'order_detail_v1:{order_id}'
 
-def handle_create_order(input_data: Dict[str, Any], strategy_type: str = 'standard') -> int:
+
+def order_detail(order_id: int) -> Dict[str, Any]:
+    """
+    Obtiene los datos de la página de detalle de un pedido: pedido con items,
+    envío más reciente e información de patrones.
+    Se cachean por pedido y se invalidan con invalidate_order_cache() (ver signals.py).
+    """
+    return cache.get_or_set(
+        order_detail_cache_key(order_id),
+        lambda: {
+            'order': order_with_items(order_id),
+            'shipment': shipment_by_order(order_id),
+            'patterns_info': get_order_processing_info(order_id),
+        },
+        ORDER_DETAIL_CACHE_TIMEOUT
+    )
+
+
+def invalidate_order_cache(order_id: int) -> None:
+    """Descarta los datos cacheados de un pedido (detalle, estado y versión)."""
+    invalidate_orders_cache((order_id,))
+
+
+def invalidate_orders_cache(order_ids: Iterable[int]) -> None:
+    """Descarta los datos cacheados de varios pedidos con un solo delete_many."""
+    cache.delete_many([
+        key
+        for order_id in order_ids
+        for key in (order_detail_cache_key(order_id),
+                    order_status_cache_key(order_id),
+                    order_version_cache_key(order_id))
+    ])
+
+
+def order_version_cache_key(order_id: int) -> str:
+    """Clave de caché de la versión de un pedido (ETag de su página de detalle)."""
+    return f'order_version_v1:{order_id}'
+
+
+def order_version(order_id: int) -> str:
+    """
+    Token que identifica el estado actual de un pedido; cambia cada vez que se
+    invalida su caché (ver signals.py) y, como mucho, cada ORDER_DETAIL_CACHE_TIMEOUT
+    segundos: así los cambios que no emiten señales (bulk_create/update, otros procesos)
+    no dejan un ETag obsoleto más tiempo que el propio detalle cacheado.
+    """
+    return cache.get_or_set(order_version_cache_key(order_id), lambda: secrets.token_hex(8),
+                            ORDER_DETAIL_CACHE_TIMEOUT)
+
+
+# Vigencia (segundos) del estado cacheado que sirve la API de sondeo
+ORDER_STATUS_CACHE_TIMEOUT = 10
+
+
+def order_status_cache_key(order_id: int) -> str:
+    """Clave de caché del estado de un pedido (order_status_api)."""
+    return f'order_status_v1:{order_id}'
+
+
+# Textos fijos de la traza de handle_create_order: se arman una sola vez al importar
+_BANNER = "=" * 60
+_CREATE_ORDER_HEADER = "🚀 Iniciando creación de pedido con patrones de diseño\n" + _BANNER
+_CREATE_ORDER_SUMMARY = "\n".join([
+    "",
+    _BANNER,
+    "🎉 PEDIDO CREADO EXITOSAMENTE CON PATRONES DE DISEÑO",
+    _BANNER,
+    "📋 Pedido ID: #%s",
+    "👤 Cliente: %s",
+    "📍 Dirección: %s",
+    "🚚 Proveedor: %s (tracking: %s)",
+    "📊 Estrategia: %s",
+    "🔔 Notificaciones: %d canales",
+    _BANNER,
+])
+
+
+def _build_notification_subject() -> OrderNotificationSubject:
+    """Crea un sujeto con los canales por defecto (email, webhook, SMS)."""
+    subject = OrderNotificationSubject()
+    subject.attach_observer(EmailNotificationObserver())
+    subject.attach_observer(WebhookNotificationObserver())
+    subject.attach_observer(SMSNotificationObserver())
+    return subject
+
+
+# Sujeto compartido por handle_create_order(): los observadores no guardan estado
+# por pedido, así que se crean una sola vez al importar el módulo
+_DEFAULT_NOTIFICATION_SUBJECT = _build_notification_subject()
+
+
+def handle_create_order(
+    input_data: Dict[str, Any],
+    strategy_type: str = 'standard',
+    catalog: Optional[Dict[int, Product]] = None
+) -> int:
     """
     FUNCIÓN PRINCIPAL REFACTORIZADA CON PATRONES DE DISEÑO
     
@@ -994,6 +1430,7 @@ def handle_create_order(input_data: Dict[str, Any], strategy_type: str = 'standa
     Args:
         input_data: Diccionario con datos del formulario
         strategy_type: Tipo de estrategia ('standard', 'eco', 'cost')
+        catalog: Productos ya cargados {id: Product} (opcional, evita releerlos)
         
     Returns:
         ID del pedido creado
@@ -1001,14 +1438,31 @@ def handle_create_order(input_data: Dict[str, Any], strategy_type: str = 'standa
     Raises:
         ValueError: Si los datos de entrada no son válidos
     """
-    print("🚀 Iniciando creación de pedido con patrones de diseño")
-    print("=" * 60)
+    return _create_order(input_data, strategy_type, catalog)['order_id']
+
+
+def _create_order(
+    input_data: Dict[str, Any],
+    strategy_type: str = 'standard',
+    catalog: Optional[Dict[int, Product]] = None,
+    notification_subject: Optional[OrderNotificationSubject] = None
+) -> Dict[str, Any]:
+    """
+    Implementación de handle_create_order().
+    Retorna, además del ID, los objetos ya creados en memoria (pedido, envío,
+    proveedor, tracking y estrategia) para que los llamadores no los relean de BD.
+    Las notificaciones salen por notification_subject; si no se indica, se usa el
+    sujeto compartido del módulo.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug(_CREATE_ORDER_HEADER)
     
     try:
         # ============================================
         # PATRÓN BUILDER: Construcción del pedido
         # ============================================
-        print("🔨 Aplicando patrón BUILDER para construcción del pedido...")
+        logger.debug("🔨 Aplicando patrón BUILDER para construcción del pedido...")
         
         builder = OrderBuilder()
         order = (builder
@@ -1016,73 +1470,66 @@ def handle_create_order(input_data: Dict[str, Any], strategy_type: str = 'standa
                 .with_address(input_data.get('address', ''))
                 .with_priority(input_data.get('priority', 'normal'))
                 .with_fragility(input_data.get('fragility', 'ninguna'))
-                .with_items(input_data.get('items', {}))
+                .with_items(input_data.get('items', {}), catalog)
                 .build())
         
-        # Obtener resumen del pedido construido
-        order_summary = builder.get_order_summary()
-        print(f"   ✅ Pedido #{order.id} construido exitosamente")
-        print(f"   📦 Código paquete: {order_summary['package_code']}")
-        print(f"   🏷️  Etiqueta manejo: {order_summary['handling_label']}")
-        print(f"   ⚖️  Peso total: {order_summary['total_weight']}g")
-        print(f"   📅 Recogida estimada: {order_summary['estimated_pickup_date']}")
+        # Resumen del pedido construido (solo se arma si se va a registrar)
+        if debug:
+            order_summary = builder.get_order_summary()
+            logger.debug("   ✅ Pedido #%s construido exitosamente\n"
+                         "   📦 Código paquete: %s\n"
+                         "   🏷️  Etiqueta manejo: %s\n"
+                         "   ⚖️  Peso total: %sg\n"
+                         "   📅 Recogida estimada: %s",
+                         order.id, order_summary['package_code'], order_summary['handling_label'],
+                         order_summary['total_weight'], order_summary['estimated_pickup_date'])
         
         # ============================================
         # PATRÓN STRATEGY: Selección de proveedor
         # ============================================
-        print(f"\n📋 Aplicando patrón STRATEGY ({strategy_type}) para selección de proveedor...")
-        
-        # Configurar estrategia según parámetro
-        strategies = {
-            'standard': StandardSelectionStrategy(),
-            'eco': EcoFriendlySelectionStrategy(),
-            'cost': CostOptimizedSelectionStrategy()
-        }
+        logger.debug("\n📋 Aplicando patrón STRATEGY (%s) para selección de proveedor...", strategy_type)
         
-        strategy = strategies.get(strategy_type, StandardSelectionStrategy())
+        # Configurar estrategia según parámetro (instancias compartidas, sin estado)
+        try:
+            strategy = _STRATEGIES[strategy_type]
+        except KeyError:
+            strategy = _STRATEGIES['standard']
         selector = ProviderSelector(strategy)
         
-        # Datos para selección de proveedor
-        selection_data = {
+        # Datos estandarizados del pedido: los usan tanto la estrategia como el adapter
+        # (ninguno los modifica), así que se arma un único diccionario
+        order_data = {
+            'order_id': order.id,
+            'weight': order.total_weight,
             'priority': order.priority,
             'fragility': order.fragility,
-            'weight': order.total_weight,
             'address': order.address
         }
         
-        selection_result = selector.select_provider(selection_data)
+        selection_result = selector.select_provider(order_data)
         selected_provider = selection_result['provider']
         
-        print(f"   ✅ Proveedor seleccionado: {selected_provider}")
-        print(f"   📊 Estrategia usada: {selection_result['strategy']}")
-        print(f"   💡 Razón: {selection_result['reason']}")
+        if debug:
+            logger.debug("   ✅ Proveedor seleccionado: %s\n   📊 Estrategia usada: %s\n   💡 Razón: %s",
+                         selected_provider, selection_result['strategy'], selection_result['reason'])
         
         # ============================================
         # PATRÓN ADAPTER: Integración con proveedor
         # ============================================
-        print(f"\n🔌 Aplicando patrón ADAPTER para integración con {selected_provider}...")
+        logger.debug("\n🔌 Aplicando patrón ADAPTER para integración con %s...", selected_provider)
         
         try:
             # Crear adapter apropiado usando factory
             provider_adapter = ShippingAdapterFactory.create_adapter(selected_provider)
             
-            # Datos estandarizados para el adapter
-            adapter_data = {
-                'order_id': order.id,
-                'weight': order.total_weight,
-                'priority': order.priority,
-                'fragility': order.fragility,
-                'address': order.address
-            }
-            
             # Solicitar recogida usando interfaz unificada
-            tracking_id = provider_adapter.request_pickup(adapter_data)
+            tracking_id = provider_adapter.request_pickup(order_data)
             
-            print(f"   ✅ Integración exitosa con {provider_adapter.get_provider_name()}")
-            print(f"   🏷️  Tracking ID: {tracking_id}")
+            logger.debug("   ✅ Integración exitosa con %s\n   🏷️  Tracking ID: %s",
+                         provider_adapter.get_provider_name(), tracking_id)
             
         except ValueError as e:
-            print(f"   ❌ Error en adapter: {e}")
+            logger.error("   ❌ Error en adapter: %s", e)
             raise
         
         # Registrar envío en base de datos
@@ -1094,25 +1541,16 @@ def handle_create_order(input_data: Dict[str, Any], strategy_type: str = 'standa
                 status='CONFIRMADO'
             )
             
-            print(f"   💾 Envío registrado en BD: {shipment}")
+            logger.debug("   💾 Envío registrado en BD: %s", shipment)
         
         # ============================================
         # PATRÓN OBSERVER: Sistema de notificaciones
         # ============================================
-        print(f"\n🔔 Aplicando patrón OBSERVER para notificaciones...")
-        
-        # Configurar sujeto observable
-        notification_subject = OrderNotificationSubject()
-        
-        # Configurar observadores (canales de notificación)
-        email_observer = EmailNotificationObserver()
-        webhook_observer = WebhookNotificationObserver()
-        sms_observer = SMSNotificationObserver()
+        logger.debug("\n🔔 Aplicando patrón OBSERVER para notificaciones...")
         
-        # Registrar observadores
-        notification_subject.attach_observer(email_observer)
-        notification_subject.attach_observer(webhook_observer)
-        notification_subject.attach_observer(sms_observer)
+        # Sujeto observable ya configurado: no se crean observadores por pedido
+        if notification_subject is None:
+            notification_subject = _DEFAULT_NOTIFICATION_SUBJECT
         
         # Notificar evento de creación de pedido
         confirmation_message = (
@@ -1121,29 +1559,33 @@ def handle_create_order(input_data: Dict[str, Any], strategy_type: str = 'standa
             f"Estrategia usada: {selection_result['strategy']}"
         )
         
-        notification_subject.notify_observers(order, 'CREATED', confirmation_message)
+        # Los envíos (email, webhook, SMS) salen solo cuando el pedido y su envío están
+        # confirmados en BD; si el llamador abrió una transacción, se esperan a su COMMIT
+        transaction.on_commit(partial(notification_subject.notify_observers,
+                                      order, 'CREATED', confirmation_message))
         
-        print(f"   ✅ Notificaciones enviadas a {len(notification_subject.get_observers_info())} canales")
-        print(f"   📝 Canales activos: {', '.join(notification_subject.get_observers_info())}")
+        if debug:
+            channels = notification_subject.get_observers_info()
+            logger.debug("   ✅ Notificaciones enviadas a %d canales\n   📝 Canales activos: %s",
+                         len(channels), ', '.join(channels))
+            
+            # ============================================
+            # RESUMEN FINAL
+            # ============================================
+            logger.debug(_CREATE_ORDER_SUMMARY, order.id, order.customer_email, order.address,
+                         selected_provider, tracking_id, selection_result['strategy'], len(channels))
         
-        # ============================================
-        # RESUMEN FINAL
-        # ============================================
-        print("\n" + "=" * 60)
-        print("🎉 PEDIDO CREADO EXITOSAMENTE CON PATRONES DE DISEÑO")
-        print("=" * 60)
-        print(f"📋 Pedido ID: #{order.id}")
-        print(f"👤 Cliente: {order.customer_email}")
-        print(f"📍 Dirección: {order.address}")
-        print(f"🚚 Proveedor: {selected_provider} (tracking: {tracking_id})")
-        print(f"📊 Estrategia: {selection_result['strategy']}")
-        print(f"🔔 Notificaciones: {len(notification_subject.get_observers_info())} canales")
-        print("=" * 60)
-        
-        return order.id
+        return {
+            'order_id': order.id,
+            'order': order,
+            'shipment': shipment,
+            'provider': selected_provider,
+            'tracking_id': tracking_id,
+            'strategy_used': selection_result['strategy']
+        }
         
     except Exception as e:
-        print(f"\n❌ ERROR en creación de pedido: {e}")
+        logger.error("\n❌ ERROR en creación de pedido: %s", e)
         raise
 
 
@@ -1161,6 +1603,12 @@ def select_provider_naive(priority: str, fragility: str, total_weight: int) -> s
     print("⚠️  ADVERTENCIA: Usando función legacy select_provider_naive")
     print("   💡 Recomendación: Migrar a ProviderSelector con patrón Strategy")
     
+    return _select_provider_naive_cached(priority, fragility, total_weight)
+
+
+@lru_cache(maxsize=512)
+def _select_provider_naive_cached(priority: str, fragility: str, total_weight: int) -> str:
+    """Decisión pura de select_provider_naive, memoizada por (prioridad, fragilidad, peso)."""
     if priority == 'express' and fragility != 'ninguna':
         return 'ecobike'
     if total_weight <= 1200:
@@ -1168,6 +1616,13 @@ def select_provider_naive(priority: str, fragility: str, total_weight: int) -> s
     return 'paqz'
 
 
+# Prefijo de tracking por proveedor en la función legacy (cualquier otro usa 'PAQ')
+_NAIVE_TRACKING_PREFIXES = {
+    'motoya': 'MYA',
+    'ecobike': 'EBK',
+}
+
+
 def request_pickup_naive(provider: str, data: Dict[str, Any]) -> str:
     """
     FUNCIÓN LEGACY: Mantenida para compatibilidad.
@@ -1178,12 +1633,8 @@ def request_pickup_naive(provider: str, data: Dict[str, Any]) -> str:
     print("⚠️  ADVERTENCIA: Usando función legacy request_pickup_naive")
     print("   💡 Recomendación: Migrar a ShippingAdapterFactory con patrón Adapter")
     
-    if provider == 'motoya':
-        return f'MYA-{secrets.token_hex(3).upper()}'
-    elif provider == 'ecobibe':
-        return f'EBK-{secrets.token_hex(3).upper()}'
-    else:
-        return f'PAQ-{secrets.token_hex(3).upper()}'
+    prefix = _NAIVE_TRACKING_PREFIXES.get(provider, 'PAQ')
+    return f'{prefix}-{_tracking_suffix()}'
 
 
 # ==========================================
@@ -1198,8 +1649,10 @@ class OrderService:
     
     def __init__(self):
         """Inicializa el servicio con configuración por defecto."""
+        # Los observadores no guardan estado por pedido: se registran una sola vez
         self.notification_subject = OrderNotificationSubject()
-        
+        self._setup_observers()
+    
     def create_order_with_patterns(
         self,
         customer_email: str,
@@ -1221,11 +1674,13 @@ class OrderService:
             strategy: Estrategia de selección ('standard' | 'eco' | 'cost')
             
         Returns:
-            Diccionario con información del pedido creado y patrones utilizados
+            Diccionario con información del pedido creado y patrones utilizados:
+            - order_id: ID del pedido
+            - patterns_used: textos descriptivos por patrón (builder, strategy, adapter, observer)
+            - order_details: 'order' (Order) y 'shipment' (Shipment) son instancias del
+              modelo, no serializables a JSON; 'provider', 'tracking_id' y
+              'strategy_used' son texto
         """
-        # Configurar observadores
-        self._setup_observers()
-        
         # Crear pedido usando handle_create_order con patrones
         input_data = {
             'customer_email': customer_email,
@@ -1235,10 +1690,10 @@ class OrderService:
             'items': items
         }
         
-        order_id = handle_create_order(input_data, strategy)
-        
-        # Obtener información detallada del pedido creado
-        order_info = self._get_order_details(order_id)
+        # Los detalles salen de lo ya creado en memoria: no se vuelve a consultar la BD
+        order_info = _create_order(input_data, strategy,
+                                   notification_subject=self.notification_subject)
+        order_id = order_info.pop('order_id')
         
         return {
             'order_id': order_id,
@@ -1253,9 +1708,6 @@ class OrderService:
     
     def _setup_observers(self):
         """Configura los observadores por defecto."""
-        # Limpiar observadores existentes
-        self.notification_subject = OrderNotificationSubject()
-        
         # Agregar observadores estándar
         email_observer = EmailNotificationObserver()
         webhook_observer = WebhookNotificationObserver("https://api.external-system.com/webhook")
@@ -1265,22 +1717,6 @@ class OrderService:
         self.notification_subject.attach_observer(webhook_observer)
         self.notification_subject.attach_observer(sms_observer)
     
-    def _get_order_details(self, order_id: int) -> Dict[str, Any]:
-        """Obtiene detalles completos del pedido."""
-        try:
-            order = Order.objects.get(id=order_id)
-            shipment = Shipment.objects.filter(order_id=order_id).first()
-            
-            return {
-                'order': order,
-                'shipment': shipment,
-                'provider': shipment.provider if shipment else None,
-                'tracking_id': shipment.tracking_id if shipment else None,
-                'strategy_used': 'Estrategia aplicada durante creación'
-            }
-        except Order.DoesNotExist:
-            return {}
-    
     def simulate_status_change(self, order_id: int, new_status: str) -> List[str]:
         """
         Simula cambio de estado del pedido para demostrar patrón Observer.
@@ -1295,10 +1731,6 @@ class OrderService:
         try:
             order = Order.objects.get(id=order_id)
             
-            # Configurar observadores si no están configurados
-            if not self.notification_subject.get_observers_info():
-                self._setup_observers()
-            
             # Generar mensaje según el estado
             status_messages = {
                 'dispatched': 'Pedido empacado y listo para recogida',
@@ -1328,18 +1760,24 @@ class OrderService:
             Información del estado del pedido
         """
         try:
-            order = Order.objects.get(id=order_id)
-            shipment = Shipment.objects.filter(order_id=order_id).first()
-            notifications = Notification.objects.filter(order_id=order_id).count()
+            # Pedido, último envío y conteo de notificaciones en una sola consulta:
+            # el envío se lee con subconsultas correlacionadas sobre (order_id, -id)
+            latest_shipment = Shipment.objects.filter(order_id=OuterRef('pk')).order_by('-id')
+            order = (Order.objects.only('id', 'customer_email', 'priority')
+                     .annotate(notifications_sent=Count('notification'),
+                               shipment_status=Subquery(latest_shipment.values('status')[:1]),
+                               shipment_provider=Subquery(latest_shipment.values('provider')[:1]),
+                               shipment_tracking_id=Subquery(latest_shipment.values('tracking_id')[:1]))
+                     .get(id=order_id))
             
             return {
                 'order_id': order_id,
                 'customer_email': order.customer_email,
                 'priority': order.priority,
-                'status': shipment.status if shipment else 'PENDING',
-                'provider': shipment.provider if shipment else None,
-                'tracking_id': shipment.tracking_id if shipment else None,
-                'notifications_sent': notifications
+                'status': order.shipment_status or 'PENDING',
+                'provider': order.shipment_provider,
+                'tracking_id': order.shipment_tracking_id,
+                'notifications_sent': order.notifications_sent
             }
             
         except Order.DoesNotExist:
@@ -1357,9 +1795,14 @@ def get_order_processing_info(order_id: int) -> Dict[str, Any]:
         Información de patrones utilizados en el pedido
     """
     try:
-        order = Order.objects.get(id=order_id)
-        shipment = Shipment.objects.filter(order_id=order_id).first()
-        notifications = list(Notification.objects.filter(order_id=order_id))
+        order = Order.objects.only('id', 'priority', 'fragility', 'total_weight').get(id=order_id)
+        shipment = shipment_by_order(order_id)
+        
+        # Conteo por canal agrupado en la BD: total y canales sin materializar notificaciones
+        channel_counts = dict(Notification.objects.filter(order_id=order_id)
+                              .values_list('channel')
+                              .annotate(total=Count('id'))
+                              .order_by())
         
         # Simular información de patrones (en implementación real se obtendría de logs/metadata)
         return {
@@ -1386,8 +1829,8 @@ def get_order_processing_info(order_id: int) -> Dict[str, Any]:
             'observer_info': {
                 'pattern': 'Observer (Comportamental)',
                 'description': 'Sistema de notificaciones multi-canal',
-                'notifications_sent': len(notifications),
-                'channels_used': list(set([n.channel for n in notifications])),
+                'notifications_sent': sum(channel_counts.values()),
+                'channels_used': list(channel_counts),
                 'auto_notification': True
             }
         }
@@ -0,0 +1,49 @@
+"""
+Receptores de señales de la aplicación orders.
+Mantienen coherentes los datos cacheados: el catálogo de productos (products_all),
+el listado de la página principal y el detalle de cada pedido (order_detail).
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Product, Order, OrderItem, Shipment, Notification
+from .services import (
+    invalidate_products_cache,
+    invalidate_order_cache,
+    invalidate_orders_cache,
+    bump_home_cache_version,
+)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, created=False, **kwargs):
+    """
+    Invalida el catálogo cacheado cuando se crea, modifica o elimina un producto.
+    Si se modifica, también el detalle de los pedidos que lo incluyen (muestran su nombre);
+    uno nuevo no está en ningún pedido y uno eliminado tampoco (on_delete=RESTRICT).
+    """
+    invalidate_products_cache()
+    if kwargs['signal'] is post_save and not created:
+        invalidate_orders_cache(
+            OrderItem.objects.filter(product_id=instance.pk).values_list('order_id', flat=True).distinct()
+        )
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    """Invalida el detalle cacheado del pedido y el listado de pedidos recientes."""
+    invalidate_order_cache(instance.pk)
+    bump_home_cache_version()
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_save, sender=Shipment)
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_delete, sender=Shipment)
+@receiver(post_delete, sender=Notification)
+def order_child_changed(sender, instance, **kwargs):
+    """Invalida el detalle cacheado del pedido al que pertenece el registro guardado o eliminado."""
+    invalidate_order_cache(instance.order_id)
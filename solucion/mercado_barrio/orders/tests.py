@@ -2,16 +2,30 @@
 Tests básicos para verificar la traducción PHP->Python.
 Verificación de que toda la funcionalidad original está preservada.
 """
+from concurrent.futures import ThreadPoolExecutor
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.messages import get_messages
-from orders.models import Product, Order, OrderItem, Shipment, Notification
-from orders.services import (
+from mercado_barrio.orders.models import Product, Order, OrderItem, Shipment, Notification
+from mercado_barrio.orders.services import (
     products_all, 
     orders_latest, 
     handle_create_order,
     select_provider_naive,
-    request_pickup_naive
+    request_pickup_naive,
+    ProviderSelector,
+    ProviderSelectionStrategy,
+    StandardSelectionStrategy,
+    EcoFriendlySelectionStrategy,
+    CostOptimizedSelectionStrategy,
+    OrderBatch,
+    order_detail,
+    invalidate_products_cache,
+    OrderNotificationSubject,
+    EmailNotificationObserver,
+    WebhookNotificationObserver,
+    SMSNotificationObserver,
+    OrderService,
 )
 
 
@@ -20,19 +34,110 @@ class TranslationVerificationTest(TestCase):
     Pruebas para verificar que la traducción PHP->Python mantiene toda la funcionalidad.
     """
     
-    def setUp(self):
-        """Configurar datos de prueba equivalentes a seed.sql"""
-        self.products = [
-            Product.objects.create(sku='VEL-AROMA', name='Vela aromática', weight_grams=300, fragile=True),
-            Product.objects.create(sku='TE-VERDE', name='Té verde 250g', weight_grams=250, fragile=False),
-            Product.objects.create(sku='TAZA-CE', name='Taza cerámica', weight_grams=400, fragile=True),
-        ]
+    @classmethod
+    def setUpTestData(cls):
+        """Configurar datos de prueba equivalentes a seed.sql (una vez por clase)"""
+        cls.products = Product.objects.bulk_create([
+            Product(sku='VEL-AROMA', name='Vela aromática', weight_grams=300, fragile=True),
+            Product(sku='TE-VERDE', name='Té verde 250g', weight_grams=250, fragile=False),
+            Product(sku='TAZA-CE', name='Taza cerámica', weight_grams=400, fragile=True),
+        ])
+        # bulk_create no emite post_save: descartar un catálogo cacheado previo
+        invalidate_products_cache()
     
     def test_products_all_equivalence(self):
         """Verificar equivalencia con products_all() de PHP"""
         products = products_all()
         self.assertEqual(len(products), 3)
         self.assertEqual(products[0].name, 'Taza cerámica')  # Ordenado por nombre
+
+    def test_products_all_cache_invalidation(self):
+        """Verificar que el catálogo cacheado se invalida al crear o borrar productos"""
+        self.assertEqual(len(products_all()), 3)
+
+        with self.assertNumQueries(0):
+            products_all()
+
+        nuevo = Product.objects.create(sku='MIEL-500', name='Miel 500g', weight_grams=500, fragile=False)
+        self.assertEqual(len(products_all()), 4)
+
+        nuevo.delete()
+        self.assertEqual(len(products_all()), 3)
+
+    def test_order_detail_cache_invalidation(self):
+        """Verificar que el detalle cacheado de un pedido se invalida al registrar su envío"""
+        order = Order.objects.create(customer_email='cache@example.com', address='Calle 1')
+        self.assertIsNone(order_detail(order.id)['shipment'])
+
+        with self.assertNumQueries(0):
+            order_detail(order.id)
+
+        Shipment.objects.create(order=order, provider='motoya', tracking_id='MYA-000001')
+        self.assertEqual(order_detail(order.id)['shipment'].tracking_id, 'MYA-000001')
+
+    def test_order_detail_cache_invalidation_on_delete_and_rename(self):
+        """Verificar que el detalle cacheado se invalida al borrar su envío o renombrar un producto"""
+        order = Order.objects.create(customer_email='cache@example.com', address='Calle 1')
+        OrderItem.objects.create(order=order, product=self.products[0], quantity=1)
+        shipment = Shipment.objects.create(order=order, provider='motoya', tracking_id='MYA-000002')
+        self.assertEqual(order_detail(order.id)['shipment'].tracking_id, 'MYA-000002')
+
+        shipment.delete()
+        self.assertIsNone(order_detail(order.id)['shipment'])
+
+        product = Product.objects.get(pk=self.products[0].pk)
+        product.name = 'Vela de soya'
+        product.save()
+        items = order_detail(order.id)['order']['items']
+        self.assertEqual(items[0].product.name, 'Vela de soya')
+    
+    def test_concurrent_notification_matches_serial(self):
+        """Verificar que notificar con un executor produce las mismas notificaciones y en el mismo orden"""
+        order = Order.objects.create(customer_email='notify@example.com', address='Calle 2')
+        observers = (EmailNotificationObserver(), WebhookNotificationObserver(), SMSNotificationObserver())
+        
+        serial = OrderNotificationSubject()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            concurrent = OrderNotificationSubject(executor=executor)
+            for subject in (serial, concurrent):
+                for observer in observers:
+                    subject.attach_observer(observer)
+                subject.notify_observers(order, 'CREATED', 'Pedido confirmado')
+        
+        rows = list(Notification.objects.filter(order=order).order_by('id').values_list('channel', 'message'))
+        self.assertEqual([channel for channel, _ in rows[:3]], ['email', 'webhook', 'sms'])
+        self.assertEqual(rows[3:], rows[:3])
+    
+    def test_order_show_etag_changes_on_child_delete(self):
+        """Verificar que la página de detalle responde 304 sin cambios y 200 con ETag nuevo tras borrar un envío"""
+        order = Order.objects.create(customer_email='etag@example.com', address='Calle 3')
+        shipment = Shipment.objects.create(order=order, provider='motoya', tracking_id='MYA-000003')
+        url = reverse('order_show', args=[order.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        shipment.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotContains(response, 'MYA-000003')
+    
+    def test_order_status_api_conditional_get(self):
+        """Verificar que la API de estado responde 304 con ETag exacto, débil o '*'"""
+        order = Order.objects.create(customer_email='status@example.com', address='Calle 4')
+        url = reverse('order_status_api', args=[order.id])
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        for if_none_match in (etag, f'W/{etag}', '*'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
     
     def test_order_creation_equivalence(self):
         """Verificar equivalencia con handle_create_order() de PHP"""
@@ -44,7 +149,9 @@ class TranslationVerificationTest(TestCase):
             'items': {self.products[0].id: 2, self.products[1].id: 1}
         }
         
-        order_id = handle_create_order(form_data)
+        # Las notificaciones se envían al confirmar la transacción (on_commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            order_id = handle_create_order(form_data)
         
         # Verificar que se creó el pedido
         order = Order.objects.get(id=order_id)
@@ -61,8 +168,26 @@ class TranslationVerificationTest(TestCase):
         self.assertIn(shipment.provider, ['motoya', 'ecobike', 'paqz'])
         
         # Verificar notificaciones
-        notifications = Notification.objects.filter(order=order)
-        self.assertEqual(notifications.count(), 2)  # email y webhook
+        channels = Notification.objects.filter(order=order).values_list('channel', flat=True)
+        self.assertEqual(sorted(channels), ['email', 'sms', 'webhook'])
+    
+    def test_create_order_with_patterns_result(self):
+        """Verificar la forma del resultado de OrderService.create_order_with_patterns()"""
+        result = OrderService().create_order_with_patterns(
+            customer_email='service@example.com',
+            address='Calle 45',
+            priority='normal',
+            fragility='ninguna',
+            items={self.products[1].id: 1},
+        )
+        details = result['order_details']
+        self.assertEqual(set(details), {'order', 'shipment', 'provider', 'tracking_id', 'strategy_used'})
+        self.assertIsInstance(details['order'], Order)
+        self.assertEqual(details['order'].id, result['order_id'])
+        self.assertIsInstance(details['shipment'], Shipment)
+        self.assertEqual(details['provider'], details['shipment'].provider)
+        self.assertEqual(details['tracking_id'], details['shipment'].tracking_id)
+        self.assertEqual(details['strategy_used'], result['patterns_used']['strategy'])
     
     def test_provider_selection_logic(self):
         """Verificar que la lógica de selección de proveedor es idéntica a PHP"""
@@ -78,6 +203,73 @@ class TranslationVerificationTest(TestCase):
         provider = select_provider_naive('normal', 'ninguna', 1500)
         self.assertEqual(provider, 'paqz')
     
+    def test_batch_provider_selection(self):
+        """Verificar que la selección por lotes coincide con la selección por pedido"""
+        orders = [
+            {'weight': w, 'priority': p, 'fragility': f}
+            for w in (500, 1200, 1800, 2500, 4000, 6000)
+            for p in ('normal', 'express')
+            for f in ('ninguna', 'debil', 'alta')
+        ]
+        for strategy in (StandardSelectionStrategy(), EcoFriendlySelectionStrategy(),
+                         CostOptimizedSelectionStrategy()):
+            selector = ProviderSelector(strategy)
+            expected = [selector.select_provider(o)['provider'] for o in orders]
+            self.assertEqual(selector.select_providers_batch(orders), expected)
+            self.assertEqual(selector.select_providers_batch(OrderBatch.from_orders(orders)), expected)
+    
+    def test_selection_result_as_dict(self):
+        """Verificar que el resultado de selección se comporta como el diccionario original"""
+        result = ProviderSelector(StandardSelectionStrategy()).select_provider(
+            {'weight': 800, 'priority': 'normal', 'fragility': 'ninguna'})
+        self.assertEqual(dict(result), {
+            'provider': 'motoya',
+            'strategy': result.strategy,
+            'reason': 'Proveedor motoya seleccionado para pedido de 800g, prioridad normal, fragilidad ninguna',
+        })
+        self.assertIn('reason', result)
+        self.assertEqual(list(result), ['provider', 'strategy', 'reason'])
+        self.assertIsNone(result.get('tracking_id'))
+    
+    def test_selection_result_reason_snapshot(self):
+        """Verificar que la razón describe los datos usados al seleccionar, aunque luego cambien"""
+        order_data = {'weight': 800, 'priority': 'normal', 'fragility': 'ninguna'}
+        result = ProviderSelector(StandardSelectionStrategy()).select_provider(order_data)
+        order_data.update(weight=5000, priority='express', fragility='alta')
+        self.assertEqual(
+            result['reason'],
+            'Proveedor motoya seleccionado para pedido de 800g, prioridad normal, fragilidad ninguna',
+        )
+    
+    def test_custom_strategy_name(self):
+        """Verificar que una estrategia propia puede informar su nombre con get_strategy_name()"""
+        class FixedNameStrategy(ProviderSelectionStrategy):
+            def select_provider(self, order_data):
+                return 'motoya'
+            
+            def get_strategy_name(self):
+                return 'Estrategia fija'
+        
+        result = ProviderSelector(FixedNameStrategy()).select_provider({'weight': 500})
+        self.assertEqual(result['strategy'], 'Estrategia fija')
+    
+    def test_custom_strategy_batch_matches_single(self):
+        """Verificar que el lote usa select_provider() de una estrategia propia sin reglas"""
+        class LightFirstStrategy(ProviderSelectionStrategy):
+            def select_provider(self, order_data):
+                return 'motoya' if order_data['weight'] <= 3000 else 'ecobike'
+        
+        class OverriddenStandardStrategy(StandardSelectionStrategy):
+            def select_provider(self, order_data):
+                return 'motoya'
+        
+        orders = [{'weight': w, 'priority': 'normal', 'fragility': 'ninguna'} for w in (500, 2500, 6000)]
+        for strategy in (LightFirstStrategy(), OverriddenStandardStrategy()):
+            selector = ProviderSelector(strategy)
+            expected = [selector.select_provider(o)['provider'] for o in orders]
+            self.assertEqual(selector.select_providers_batch(orders), expected)
+            self.assertEqual(selector.select_providers_batch(OrderBatch.from_orders(orders)), expected)
+    
     def test_tracking_generation(self):
         """Verificar que la generación de tracking funciona como en PHP"""
         tracking_motoya = request_pickup_naive('motoya', {})
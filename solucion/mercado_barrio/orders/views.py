@@ -8,22 +8,41 @@ Patrones implementados:
 - COMPORTAMENTAL: Strategy - Para selección inteligente de proveedores
 - COMPORTAMENTAL: Observer - Para sistema de notificaciones multi-canal
 """
+import re
+
+from django.core.cache import cache
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import Http404, JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import md5
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_protect
 from .services import (
     products_all, 
     orders_latest, 
-    order_with_items, 
-    shipment_by_order, 
+    order_detail,
+    order_version,
+    home_cache_version,
+    HOME_CACHE_TIMEOUT,
+    order_status_cache_key,
+    ORDER_STATUS_CACHE_TIMEOUT,
     handle_create_order,
+    json_bytes,
     # Importar servicios con patrones de diseño
     OrderService,
-    get_order_processing_info
 )
 
+# Nombre de los campos de cantidad del formulario de pedido: items[<product_id>]
+_ITEM_KEY_RE = re.compile(r'items\[(\d+)\]')
+
+
+def _json_response(body: bytes, status: int = 200) -> HttpResponse:
+    """Respuesta JSON a partir de un cuerpo ya serializado."""
+    return HttpResponse(body, status=status, content_type='application/json')
+
 
 def home_view(request):
     """
@@ -31,15 +50,18 @@ def home_view(request):
     Muestra productos y pedidos recientes.
     """
     # Equivalente a: $products = products_all();
-    products = products_all()
+    # Se cargan de forma perezosa: si el fragmento del listado está en caché no se consultan
+    products = SimpleLazyObject(products_all)
     
     # Equivalente a: $recent = orders_latest(5);
-    recent = orders_latest(5)
+    recent = SimpleLazyObject(lambda: orders_latest(5))
     
     # Equivalente a: view('home', compact('products','recent'));
     context = {
         'products': products,
-        'recent': recent
+        'recent': recent,
+        'home_cache_version': home_cache_version(),
+        'home_cache_timeout': HOME_CACHE_TIMEOUT,
     }
     
     return render(request, 'orders/home.html', context)
@@ -72,16 +94,17 @@ def order_create_view(request):
                     'strategy': request.POST.get('strategy', 'standard')  # Estrategia de selección
                 }
                 
-                # Procesar items del formulario
+                # Procesar items del formulario: campos items[<product_id>]
                 for key, value in request.POST.items():
-                    if key.startswith('items[') and key.endswith(']'):
-                        product_id = key[6:-1]
-                        try:
-                            quantity = int(value)
-                            if quantity > 0:  # Solo agregar items con cantidad > 0
-                                form_data['items'][int(product_id)] = quantity
-                        except (ValueError, TypeError):
-                            continue
+                    match = _ITEM_KEY_RE.fullmatch(key)
+                    if match is None:
+                        continue
+                    try:
+                        quantity = int(value)
+                    except (ValueError, TypeError):
+                        continue
+                    if quantity > 0:  # Solo agregar items con cantidad > 0
+                        form_data['items'][int(match.group(1))] = quantity
                 
                 # USAR SERVICIO CON PATRONES DE DISEÑO
                 order_service = OrderService()
@@ -122,6 +145,17 @@ def order_create_view(request):
     return render(request, 'orders/order_create.html', context)
 
 
+def _order_show_etag(request, order_id):
+    """
+    ETag de la página de detalle: la versión cacheada del pedido, sin consultar la BD.
+    Con mensajes flash pendientes no se usa, para que el 304 no los oculte.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    return f'order-{order_id}-{order_version(order_id)}'
+
+
+@condition(etag_func=_order_show_etag)
 def order_show_view(request, order_id):
     """
     Vista para mostrar detalles de pedido con información de PATRONES DE DISEÑO.
@@ -140,17 +174,13 @@ def order_show_view(request, order_id):
     except (ValueError, TypeError):
         order_id = 0
     
-    # Obtener datos básicos del pedido
-    order_data = order_with_items(order_id)
-    shipment = shipment_by_order(order_id)
-    
-    # Obtener información detallada de patrones de diseño
-    patterns_info = get_order_processing_info(order_id)
+    # Pedido con items, envío e información de patrones (cacheados por pedido)
+    detail = order_detail(order_id)
     
     context = {
-        'order': order_data,
-        'shipment': shipment,
-        'patterns_info': patterns_info,  # Información adicional de patrones
+        'order': detail['order'],
+        'shipment': detail['shipment'],
+        'patterns_info': detail['patterns_info'],  # Información adicional de patrones
     }
     
     return render(request, 'orders/order_show.html', context)
@@ -160,26 +190,41 @@ def order_status_api(request, order_id):
     """
     API para obtener estado del pedido en tiempo real.
     Útil para demostrar el patrón Observer en acción.
+    
+    El GET se sondea con frecuencia: el estado se cachea unos segundos y se
+    responde con ETag para que el cliente pueda revalidar con If-None-Match (304).
     """
     try:
         order_id = int(order_id)
-        order_service = OrderService()
         
         # Simular cambio de estado para demostrar Observer
         if request.method == 'POST':
             new_status = request.POST.get('status', 'dispatched')
-            notifications_sent = order_service.simulate_status_change(order_id, new_status)
+            notifications_sent = OrderService().simulate_status_change(order_id, new_status)
             
-            return JsonResponse({
+            return _json_response(json_bytes({
                 'success': True,
                 'status_changed': new_status,
                 'notifications_sent': notifications_sent,
                 'pattern_used': 'Observer - Sistema de notificaciones automáticas'
-            })
+            }, sort_keys=True))
+        
+        # GET: Obtener estado actual (se invalida al notificar o registrar envíos).
+        # Se cachea el cuerpo ya serializado: se serializa una vez por ventana de caché
+        cache_key = order_status_cache_key(order_id)
+        cached = cache.get(cache_key)
+        if cached is None:
+            # Claves ordenadas para que el ETag sea estable
+            body = json_bytes(OrderService().get_order_status(order_id), sort_keys=True)
+            cached = (body, quote_etag(md5(body, usedforsecurity=False).hexdigest()))
+            cache.set(cache_key, cached, ORDER_STATUS_CACHE_TIMEOUT)
+        body, etag = cached
         
-        # GET: Obtener estado actual
-        status_info = order_service.get_order_status(order_id)
-        return JsonResponse(status_info)
+        # Validación condicional de Django (If-None-Match con '*' y ETags débiles),
+        # igual que @condition en order_show_view
+        response = _json_response(body)
+        response['ETag'] = etag
+        return get_conditional_response(request, etag=etag, response=response)
         
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
\ No newline at end of file
+        return _json_response(json_bytes({'error': str(e)}, sort_keys=True), status=400)
\ No newline at end of file
@@ -73,12 +73,26 @@ DATABASES = {
         'PASSWORD': 'password',            # Equivalente a DB_PASS = ''
         'HOST': '127.0.0.1',      # Equivalente a DB_HOST = '127.0.0.1'
         'PORT': '5432',
+        # Conexiones persistentes: se reutilizan entre peticiones (hasta 60 s) y se
+        # verifican antes de reutilizarlas, en lugar de abrir una por petición
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'client_encoding': 'UTF8',  # Equivalente a DB_CHARSET = 'utf8mb4'
         },
     }
 }
 
+# Caché (catálogo de productos y detalle de pedidos, ver orders/services.py)
+# En memoria por proceso; con varios workers usar un backend compartido, p. ej.:
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mercado-barrio',
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -125,4 +139,6 @@ MESSAGE_TAGS = {
 # Session configuration
 # Equivalente a session_start() en index.php
 SESSION_COOKIE_AGE = 1800  # 30 minutos
-SESSION_SAVE_EVERY_REQUEST = True
\ No newline at end of file
+# La sesión solo se escribe cuando cambia (p. ej. mensajes flash), no en cada petición:
+# los sondeos a order_status_api no generan un UPDATE en django_session
+SESSION_SAVE_EVERY_REQUEST = False
\ No newline at end of file
@@ -7,7 +7,7 @@ Ejecuta el archivo SQL poblar_database.sql usando Django.
 import os
 import sys
 import django
-from django.db import connection
+from django.db import connection, transaction
 
 # Configurar Django
 sys.path.append(os.path.join(os.path.dirname(__file__), 'mercado_barrio'))
@@ -28,21 +28,29 @@ def ejecutar_sql_file(filename):
         with open(filename, 'r', encoding='utf-8') as file:
             sql_content = file.read()
         
-        # Dividir en statements individuales
-        statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
+        # Dividir en statements individuales, quitando las líneas de comentario:
+        # cada INSERT del archivo va precedido por un encabezado "-- ..."
+        statements = []
+        for chunk in sql_content.split(';'):
+            statement = '\n'.join(
+                line for line in chunk.splitlines() if not line.strip().startswith('--')
+            ).strip()
+            if statement:
+                statements.append(statement)
         
-        # Ejecutar cada statement
-        with connection.cursor() as cursor:
+        # Ejecutar todo en una sola transacción (un único COMMIT); cada statement
+        # usa un savepoint para que un error no aborte el resto de la carga
+        with transaction.atomic(), connection.cursor() as cursor:
             success_count = 0
             for i, statement in enumerate(statements):
-                if statement.strip() and not statement.strip().startswith('--'):
-                    try:
+                try:
+                    with transaction.atomic():
                         cursor.execute(statement)
-                        success_count += 1
-                    except Exception as e:
-                        # Algunos errores son esperables (como comentarios mal formateados)
-                        if 'syntax error' not in str(e).lower():
-                            print(f"   ⚠️  Statement {i+1}: {str(e)[:100]}...")
+                    success_count += 1
+                except Exception as e:
+                    # Algunos errores son esperables (como comentarios mal formateados)
+                    if 'syntax error' not in str(e).lower():
+                        print(f"   ⚠️  Statement {i+1}: {str(e)[:100]}...")
             
             print(f"   ✅ {success_count} statements ejecutados exitosamente")
             
@@ -3,50 +3,70 @@
 Verificación rápida de la refactorización con patrones de diseño.
 """
 
-print('🧪 VERIFICACIÓN RÁPIDA DE LA REFACTORIZACIÓN')
-print('=' * 50)
-
-# Verificar que las importaciones funcionan
-try:
-    import os
-    import sys
-    import django
-    
-    # Configurar Django
-    sys.path.append('mercado_barrio')
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mercado_barrio.settings')
-    django.setup()
-    
-    # Importar clases refactorizadas
-    from mercado_barrio.orders.services import (
-        OrderBuilder,
-        ShippingAdapterFactory, 
-        StandardSelectionStrategy,
-        OrderNotificationSubject,
-        EmailNotificationObserver
-    )
-    
+
+def verify():
+    """
+    Ejecuta la verificación. Las importaciones de Django y de los servicios se
+    hacen aquí dentro para que el encabezado se imprima antes de resolverlas.
+    """
+    print('🧪 VERIFICACIÓN RÁPIDA DE LA REFACTORIZACIÓN')
+    print('=' * 50)
+
+    from django.core.exceptions import ImproperlyConfigured
+
+    # Verificar que las importaciones funcionan
+    try:
+        import os
+        import django
+        from django.apps import apps
+        from django.conf import settings
+
+        # Configurar Django: si no se indica DJANGO_SETTINGS_MODULE, solo la app de
+        # pedidos, sin admin/auth/sesiones ni base de datos
+        if not os.environ.get('DJANGO_SETTINGS_MODULE') and not settings.configured:
+            settings.configure(INSTALLED_APPS=['mercado_barrio.orders.apps.OrdersConfig'])
+        if not apps.ready:
+            django.setup()
+
+        # Importar clases refactorizadas
+        from mercado_barrio.orders.services import (
+            OrderBuilder,
+            ShippingAdapterFactory,
+            StandardSelectionStrategy,
+            OrderNotificationSubject,
+            EmailNotificationObserver
+        )
+    except (ImportError, ImproperlyConfigured) as e:
+        print(f'❌ Error: {e}')
+        print('💡 Revisa la configuración de Django')
+        import traceback
+        traceback.print_exc()
+        return
+
     print('✅ Todas las importaciones exitosas')
-    print('✅ Patrón Builder: OrderBuilder disponible')
-    print('✅ Patrón Adapter: ShippingAdapterFactory disponible') 
-    print('✅ Patrón Strategy: StandardSelectionStrategy disponible')
-    print('✅ Patrón Observer: OrderNotificationSubject disponible')
-    
-    # Verificar que las clases se pueden instanciar
-    builder = OrderBuilder()
-    strategy = StandardSelectionStrategy()
-    subject = OrderNotificationSubject()
-    observer = EmailNotificationObserver()
-    
-    print('✅ Todas las clases se instancian correctamente')
-    print()
-    print('🎉 REFACTORIZACIÓN COMPLETADA EXITOSAMENTE')
-    print('📋 Todos los patrones implementados correctamente')
-    print('📚 Ver DOCUMENTACION_PATRONES.md para detalles completos')
-    print('🚀 Ejecuta "python demo_patrones.py" para ver la demostración completa')
-    
-except Exception as e:
-    print(f'❌ Error: {e}')
-    print('💡 Revisa la configuración de Django')
-    import traceback
-    traceback.print_exc()
\ No newline at end of file
+
+    # Verificar que cada patrón está disponible y sus clases se pueden instanciar
+    checks = (
+        ('Builder', OrderBuilder),
+        ('Adapter', ShippingAdapterFactory),
+        ('Strategy', StandardSelectionStrategy),
+        ('Observer', OrderNotificationSubject),
+        ('Observer', EmailNotificationObserver),
+    )
+    for pattern, cls in checks:
+        cls()
+        print(f'✅ Patrón {pattern}: {cls.__name__} disponible')
+
+    # Resumen final en una sola escritura a stdout
+    print(
+        '✅ Todas las clases se instancian correctamente\n'
+        '\n'
+        '🎉 REFACTORIZACIÓN COMPLETADA EXITOSAMENTE\n'
+        '📋 Todos los patrones implementados correctamente\n'
+        '📚 Ver DOCUMENTACION_PATRONES.md para detalles completos\n'
+        '🚀 Ejecuta "python demo_patrones.py" para ver la demostración completa'
+    )
+
+
+if __name__ == '__main__':
+    verify()